@@ -353,14 +353,55 @@ if(ENABLE_SNAPSHOT)
   iotjs_add_compile_flags(-DENABLE_SNAPSHOT)
 endif()
 
+# Compressed JS modules (only without snapshot)
+if(ENABLE_JS_COMPRESSION)
+  if(ENABLE_SNAPSHOT)
+    message(WARNING "ENABLE_JS_COMPRESSION is ignored in snapshot mode")
+  else()
+    set(JS2C_COMPRESS_ARG --compress)
+  endif()
+endif()
+
+# Separate snapshot for each JS module (only with snapshot)
+if(ENABLE_SPLIT_SNAPSHOT)
+  if(NOT ENABLE_SNAPSHOT)
+    message(WARNING "ENABLE_SPLIT_SNAPSHOT is ignored without snapshot")
+  else()
+    set(JS2C_SPLIT_SNAPSHOT_ARG --split-snapshot)
+  endif()
+endif()
+
+# Limit of the snapshot literals stored as external magic strings
+if(DEFINED MAGIC_STRING_BUDGET AND ENABLE_SNAPSHOT)
+  set(JS2C_MAGIC_STRING_ARG --magic-string-budget=${MAGIC_STRING_BUDGET})
+endif()
+
 # Run js2c
 set(JS2C_RUN_MODE "release")
 if("${CMAKE_BUILD_TYPE}" STREQUAL "Debug")
   set(JS2C_RUN_MODE "debug")
 endif()
 
+# js2c keeps the modification time of the files it did not change, so
+# the stamp file is the only output, telling when js2c last ran. The
+# generated files are byproducts, which the build does not touch itself,
+# so an unchanged file does not cause a recompilation.
+set(JS2C_STAMP ${CMAKE_CURRENT_BINARY_DIR}/js2c.stamp)
+set(JS2C_GENERATED
+  ${IOTJS_SOURCE_DIR}/iotjs_js.c
+  ${IOTJS_SOURCE_DIR}/iotjs_js.h
+  ${IOTJS_SOURCE_DIR}/iotjs_string_ext.inl.h
+)
+# BYPRODUCTS is only known since CMake 3.2.
+if(CMAKE_VERSION VERSION_LESS 3.2)
+  set_source_files_properties(${JS2C_GENERATED} PROPERTIES GENERATED TRUE)
+else()
+  set(JS2C_BYPRODUCTS BYPRODUCTS ${JS2C_GENERATED})
+endif()
+
 add_custom_command(
-  OUTPUT ${IOTJS_SOURCE_DIR}/iotjs_js.c ${IOTJS_SOURCE_DIR}/iotjs_js.h
+  OUTPUT ${JS2C_STAMP}
+  ${JS2C_BYPRODUCTS}
   COMMAND ${CMAKE_C_COMPILER} -E -dD ${IOTJS_MODULE_DEFINES}
             ${IOTJS_SOURCE_DIR}/iotjs_magic_strings.h
           | grep IOTJS_MAGIC_STRING
@@ -369,13 +410,20 @@ add_custom_command(
   ARGS --buildtype=${JS2C_RUN_MODE}
        --modules '${IOTJS_JS_MODULES}'
        ${JS2C_SNAPSHOT_ARG}
+       ${JS2C_COMPRESS_ARG}
+       ${JS2C_MAGIC_STRING_ARG}
+       ${JS2C_SPLIT_SNAPSHOT_ARG}
   COMMAND ${CMAKE_COMMAND} -E remove
             -f ${IOTJS_SOURCE_DIR}/iotjs_magic_strings.in
+  COMMAND ${CMAKE_COMMAND} -E touch ${JS2C_STAMP}
   DEPENDS ${ROOT_DIR}/tools/js2c.py
           jerry-snapshot
           ${IOTJS_JS_MODULE_SRC}
 )
 
+# The library depends on the stamp, so js2c runs before it is built.
+add_custom_target(iotjs_js2c DEPENDS ${JS2C_STAMP})
+
 # Load all external module cmake files
 foreach(MODULE_EXTRA_CMAKE_FILE ${EXTRA_CMAKE_FILES})
   message("Using CMake file: ${MODULE_EXTRA_CMAKE_FILE}")
@@ -444,6 +492,8 @@ message(STATUS "CMAKE_C_FLAGS            ${CMAKE_C_FLAGS}")
 message(STATUS "CMAKE_TOOLCHAIN_FILE     ${CMAKE_TOOLCHAIN_FILE}")
 message(STATUS "ENABLE_LTO               ${ENABLE_LTO}")
 message(STATUS "ENABLE_SNAPSHOT          ${ENABLE_SNAPSHOT}")
+message(STATUS "ENABLE_JS_COMPRESSION    ${ENABLE_JS_COMPRESSION}")
+message(STATUS "ENABLE_SPLIT_SNAPSHOT    ${ENABLE_SPLIT_SNAPSHOT}")
 message(STATUS "EXTERNAL_INCLUDE_DIR     ${EXTERNAL_INCLUDE_DIR}")
 message(STATUS "EXTERNAL_LIBC_INTERFACE  ${EXTERNAL_LIBC_INTERFACE}")
 message(STATUS "EXTERNAL_LIBS            ${EXTERNAL_LIBS}")
@@ -465,6 +515,7 @@ iotjs_add_compile_flags(${IOTJS_MODULE_DEFINES})
 # Configure the libiotjs.a
 set(TARGET_STATIC_IOTJS libiotjs)
 add_library(${TARGET_STATIC_IOTJS} STATIC ${LIB_IOTJS_SRC})
+add_dependencies(${TARGET_STATIC_IOTJS} iotjs_js2c)
 set_target_properties(${TARGET_STATIC_IOTJS} PROPERTIES
   OUTPUT_NAME iotjs
   ARCHIVE_OUTPUT_DIRECTORY "${CMAKE_BINARY_DIR}/lib"
@@ -18,6 +18,7 @@
 #include "iotjs.h"
 #include "iotjs_handlewrap.h"
 #include "iotjs_js.h"
+#include "iotjs_lz.h"
 #include "iotjs_string_ext.h"
 
 #include "jerryscript-debugger.h"
@@ -123,9 +124,18 @@ bool iotjs_initialize(iotjs_environment_t* env) {
 
 void iotjs_run(iotjs_environment_t* env) {
 // Evaluating 'iotjs.js' returns a function.
-#ifndef ENABLE_SNAPSHOT
+#if defined(IOTJS_JS_MODULES_COMPRESSED)
+  char* source = iotjs_lz_decompress_module("iotjs", iotjs_s, iotjs_c, iotjs_l);
+  jerry_value_t jmain =
+      iotjs_jhelper_eval("iotjs.js", strlen("iotjs.js"),
+                         (const uint8_t*)source, iotjs_l, false);
+  iotjs_buffer_release(source);
+#elif !defined(ENABLE_SNAPSHOT)
   jerry_value_t jmain = iotjs_jhelper_eval("iotjs.js", strlen("iotjs.js"),
                                            iotjs_s, iotjs_l, false);
+#elif defined(IOTJS_JS_MODULES_SPLIT_SNAPSHOT)
+  jerry_value_t jmain =
+      jerry_exec_snapshot((const uint32_t*)iotjs_s, iotjs_l, 0, 0);
 #else
   jerry_value_t jmain =
       jerry_exec_snapshot((const uint32_t*)iotjs_js_modules_s,
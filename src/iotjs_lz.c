@@ -0,0 +1,97 @@
+/* Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+
+#include "iotjs_def.h"
+
+#include "iotjs_lz.h"
+
+#define IOTJS_LZ_MIN_MATCH 3
+#define IOTJS_LZ_EXTENDED_LENGTH 15
+
+
+size_t iotjs_lz_decompress(const uint8_t* src, size_t src_size, uint8_t* dst,
+                           size_t dst_size) {
+  const uint8_t* src_end = src + src_size;
+  size_t pos = 0;
+  unsigned flags = 0;
+  unsigned bits = 0;
+
+  while (pos < dst_size) {
+    if (bits == 0) {
+      if (src >= src_end) {
+        break;
+      }
+      flags = *src++;
+      bits = 8;
+    }
+
+    if (flags & 1) {
+      if (src_end - src < 2) {
+        break;
+      }
+
+      size_t distance = ((size_t)src[0] | ((size_t)(src[1] >> 4) << 8)) + 1;
+      size_t length = (size_t)(src[1] & 0x0f);
+      src += 2;
+
+      if (length == IOTJS_LZ_EXTENDED_LENGTH) {
+        if (src >= src_end) {
+          break;
+        }
+        length += *src++;
+      }
+      length += IOTJS_LZ_MIN_MATCH;
+
+      if (distance > pos || length > dst_size - pos) {
+        break;
+      }
+
+      // The regions may overlap, so copy byte by byte.
+      for (; length > 0; length--, pos++) {
+        dst[pos] = dst[pos - distance];
+      }
+    } else {
+      if (src >= src_end) {
+        break;
+      }
+      dst[pos++] = *src++;
+    }
+
+    flags >>= 1;
+    bits--;
+  }
+
+  return pos;
+}
+
+
+char* iotjs_lz_decompress_module(const char* name, const uint8_t* src,
+                                 size_t src_size, size_t size) {
+  char* buffer = iotjs_buffer_allocate(size);
+
+  uint64_t start = uv_hrtime();
+  size_t decoded = iotjs_lz_decompress(src, src_size, (uint8_t*)buffer, size);
+  uint64_t elapsed = uv_hrtime() - start;
+
+  IOTJS_ASSERT(decoded == size);
+  IOTJS_UNUSED(decoded);
+  IOTJS_UNUSED(elapsed);
+
+  DDDLOG("Decompressed JS module %s: %u -> %u bytes in %u us", name,
+         (unsigned)src_size, (unsigned)size, (unsigned)(elapsed / 1000));
+
+  return buffer;
+}
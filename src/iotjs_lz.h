@@ -0,0 +1,36 @@
+/* Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+
+#ifndef IOTJS_LZ_H
+#define IOTJS_LZ_H
+
+#include <stddef.h>
+#include <stdint.h>
+
+
+// Decompress LZSS data produced by tools/common_py/lz.py into dst.
+// Returns the number of bytes written, which is less than dst_size only if
+// the input is truncated or corrupted.
+size_t iotjs_lz_decompress(const uint8_t* src, size_t src_size, uint8_t* dst,
+                           size_t dst_size);
+
+// Decompress an embedded JS module into a newly allocated buffer of
+// `size` bytes. The buffer must be released with iotjs_buffer_release().
+char* iotjs_lz_decompress_module(const char* name, const uint8_t* src,
+                                 size_t src_size, size_t size);
+
+
+#endif /* IOTJS_LZ_H */
@@ -16,6 +16,7 @@
 #include "iotjs_def.h"
 #include "iotjs_compatibility.h"
 #include "iotjs_js.h"
+#include "iotjs_lz.h"
 #include "jerryscript-debugger.h"
 
 #include <stdlib.h>
@@ -137,9 +138,19 @@ JS_FUNCTION(CompileModule) {
   jerry_value_t jres = jerry_create_undefined();
 
   if (js_modules[i].name != NULL) {
-#ifdef ENABLE_SNAPSHOT
+#if defined(IOTJS_JS_MODULES_SPLIT_SNAPSHOT)
+    jres = jerry_exec_snapshot((const uint32_t*)js_modules[i].code,
+                               js_modules[i].length, 0, 0);
+#elif defined(ENABLE_SNAPSHOT)
     jres = jerry_exec_snapshot((const uint32_t*)iotjs_js_modules_s,
                                iotjs_js_modules_l, js_modules[i].idx, 0);
+#elif defined(IOTJS_JS_MODULES_COMPRESSED)
+    char* source =
+        iotjs_lz_decompress_module(name, (const uint8_t*)js_modules[i].code,
+                                   js_modules[i].compressed_length,
+                                   js_modules[i].length);
+    jres = WrapEval(name, iotjs_string_size(&id), source, js_modules[i].length);
+    iotjs_buffer_release(source);
 #else
     jres = WrapEval(name, iotjs_string_size(&id),
                     (const char*)js_modules[i].code, js_modules[i].length);
@@ -0,0 +1,37 @@
+/* Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+/* Used by the testrunner to run several tests in one iotjs process.
+ * The tests given as arguments are required one after the other and the
+ * output of each test is put between marker lines. The end marker holds
+ * the result of the test and its runtime in milliseconds. Only tests which
+ * finish synchronously can run this way.
+ */
+var marker = '### IOTJS BATCH ';
+
+process.argv.slice(2).forEach(function(testfile) {
+  console.log(marker + 'START ' + testfile);
+
+  var start = Date.now();
+  var status = 'PASS';
+  try {
+    require(testfile);
+  } catch (e) {
+    status = 'FAIL';
+    console.log(e && e.stack ? e.stack : String(e));
+  }
+
+  console.log(marker + 'END ' + status + ' ' + (Date.now() - start));
+});
@@ -0,0 +1,43 @@
+/* Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+/* Used by the testrunner to measure the JavaScript coverage of a test.
+ * Usage: iotjs iotjs_coverage_runner.js <coverage stream> <test file>
+ *
+ * The coverage of the instrumented modules is appended to the stream as
+ * one line of JSON when the test exits. The stream is shared by all the
+ * tests of a run, the testrunner merges it at the end.
+ */
+var fs = require('fs');
+
+var stream = process.argv[2];
+var testfile = process.argv[3];
+
+// The test sees the same arguments as without this runner.
+process.argv.splice(1, 2);
+
+process.on('exit', function() {
+  if (typeof __coverage__ == 'undefined')
+    return;
+
+  // A single write in append mode, so the lines of parallel tests are
+  // not mixed.
+  var data = Buffer(JSON.stringify(__coverage__) + '\n');
+  var fd = fs.openSync(stream, 'a');
+  fs.writeSync(fd, data, 0, data.length);
+  fs.closeSync(fd);
+});
+
+require(testfile);
@@ -114,9 +114,17 @@ def init_options():
         action='store', default=set(), type=lambda x: set(x.split(',')),
         help='Specify the path of modules.json files which should be processed '
              '(format: path1,path2,...)')
+    iotjs_group.add_argument('--js-compression',
+        action='store_true', default=False,
+        help='Store the JS modules compressed and decompress them when they '
+             'are required (only without snapshot, default: %(default)s)')
     iotjs_group.add_argument('--link-flag',
         action='append', default=[],
         help='Specify additional linker flags (can be used multiple times)')
+    iotjs_group.add_argument('--magic-string-budget', type=int, default=None,
+        metavar='BYTES',
+        help='Limit the total length of the snapshot literals stored as '
+             'external magic strings (only with snapshot, default: no limit)')
     iotjs_group.add_argument('--no-check-valgrind',
         action='store_true', default=False,
         help='Disable test execution with valgrind after build')
@@ -137,6 +145,11 @@ def init_options():
         nargs='?', default=False, const="quiet", choices=["full", "quiet"],
         help='Execute tests after build, optional argument specifies '
              'the level of output for the testrunner')
+    iotjs_group.add_argument('--split-snapshot',
+        action='store_true', default=False,
+        help='Store a separate snapshot for each JS module so only the '
+             'required modules are read (only with snapshot, '
+             'default: %(default)s)')
     iotjs_group.add_argument('--sysroot', action='store',
         help='The location of the development tree root directory (sysroot). '
              'Must be compatible with used toolchain.')
@@ -152,6 +165,10 @@ def init_options():
                  'openwrt'],
         default=platform.os(),
         help='Specify the target OS (default: %(default)s).')
+    iotjs_group.add_argument('--test-jobs', type=int, default=1,
+        metavar='JOBS',
+        help='Number of tests to run in parallel with --run-test, also in '
+             'the Valgrind pass (default: %(default)s)')
 
 
     jerry_group = parser.add_argument_group('Arguments of JerryScript',
@@ -361,6 +378,19 @@ def build_iotjs(options):
         cmake_opt.append("-DEXTRA_JERRY_CMAKE_PARAMS='%s'" %
                          ' '.join(options.jerry_cmake_param))
 
+    # --js-compression
+    if options.js_compression:
+        cmake_opt.append('-DENABLE_JS_COMPRESSION=ON')
+
+    # --split-snapshot
+    if options.split_snapshot:
+        cmake_opt.append('-DENABLE_SPLIT_SNAPSHOT=ON')
+
+    # --magic-string-budget
+    if options.magic_string_budget is not None:
+        cmake_opt.append('-DMAGIC_STRING_BUDGET=%d' %
+                         options.magic_string_budget)
+
     # --experimental
     if options.experimental:
         cmake_opt.append('-DEXPERIMENTAL=ON')
@@ -388,6 +418,11 @@ def run_checktest(options):
     if options.run_test == "quiet":
         args.append('--quiet')
 
+    # Unmarked tests may share resources, so both passes only run the
+    # tests in parallel on request.
+    if options.test_jobs:
+        args.append('--jobs=%d' % options.test_jobs)
+
     fs.chdir(path.PROJECT_ROOT)
     code = ex.run_cmd(cmd, args)
     if code != 0:
@@ -0,0 +1,652 @@
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Tokenizer based JavaScript minifier used by js2c """
+
+import re
+
+# Token types.
+WHITESPACE = 'whitespace'
+NEWLINE = 'newline'
+COMMENT = 'comment'
+NAME = 'name'
+NUMBER = 'number'
+STRING = 'string'
+TEMPLATE = 'template'
+REGEXP = 'regexp'
+PUNCTUATOR = 'punctuator'
+
+_WHITESPACE_RE = re.compile(u'[ \t\f\v\r\n\u00a0\ufeff]+')
+_LINE_COMMENT_RE = re.compile(r'//[^\r\n]*')
+_BLOCK_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+_NAME_RE = re.compile(r'(?:[A-Za-z_$]|[^\x00-\x7f]|\\u[0-9a-fA-F]{4})'
+                      r'(?:[\w$]|[^\x00-\x7f]|\\u[0-9a-fA-F]{4})*')
+_NUMBER_RE = re.compile(r'0[xX][0-9a-fA-F]+|0[oO][0-7]+|0[bB][01]+|'
+                        r'(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+_STRING_RE = re.compile(r'"(?:[^"\\\r\n]|\\[\s\S])*"|'
+                        r"'(?:[^'\\\r\n]|\\[\s\S])*'")
+_REGEXP_RE = re.compile(r'/(?:[^/\\\[\r\n]|\\.|\[(?:[^\]\\\r\n]|\\.)*\])+/'
+                        r'[\w$]*')
+
+# Punctuators ordered by length so the longest match wins.
+_PUNCTUATORS = sorted([
+    '{', '}', '(', ')', '[', ']', ';', ',', '<', '>', '+', '-', '*', '/',
+    '%', '&', '|', '^', '!', '~', '?', ':', '=', '.', '<=', '>=', '==',
+    '!=', '===', '!==', '++', '--', '<<', '>>', '>>>', '&&', '||', '+=',
+    '-=', '*=', '/=', '%=', '<<=', '>>=', '>>>=', '&=', '|=', '^=', '=>',
+    '...', '**', '**='
+], key=len, reverse=True)
+_PUNCTUATOR_RE = re.compile('|'.join(re.escape(p) for p in _PUNCTUATORS))
+
+# Keywords after which a '/' starts a regular expression.
+_REGEXP_KEYWORDS = frozenset([
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await'
+])
+
+# Punctuators which cannot end a statement: a line break after them never
+# triggers automatic semicolon insertion.
+_NO_STATEMENT_END = frozenset(p for p in _PUNCTUATORS
+                              if p not in (')', ']', '}', '++', '--'))
+
+# Punctuators which cannot start a statement: a line break before them
+# never triggers automatic semicolon insertion.
+_NO_STATEMENT_START = frozenset([
+    ')', ']', '}', ',', ';', '.', '?', ':', '=', '==', '===', '!=', '!==',
+    '<', '>', '<=', '>=', '*', '%', '&', '|', '^', '&&', '||', '+=', '-=',
+    '*=', '/=', '%=', '<<=', '>>=', '>>>=', '&=', '|=', '^=', '<<', '>>',
+    '>>>', '=>', '**', '**='
+])
+
+_RESERVED_WORDS = frozenset([
+    'break', 'case', 'catch', 'class', 'const', 'continue', 'debugger',
+    'default', 'delete', 'do', 'else', 'enum', 'export', 'extends', 'false',
+    'finally', 'for', 'function', 'if', 'implements', 'import', 'in',
+    'instanceof', 'interface', 'let', 'new', 'null', 'package', 'private',
+    'protected', 'public', 'return', 'static', 'super', 'switch', 'this',
+    'throw', 'true', 'try', 'typeof', 'var', 'void', 'while', 'with',
+    'yield', 'await', 'of', 'arguments', 'eval', 'undefined', 'NaN',
+    'Infinity'
+])
+
+# Constructs the local identifier renaming does not understand. Files
+# using any of them are minified without renaming.
+_UNSUPPORTED_NAMES = frozenset(['let', 'const', 'class', 'eval', 'with'])
+_UNSUPPORTED_PUNCTUATORS = frozenset(['=>', '...'])
+
+_SHORT_NAME_CHARS = ('abcdefghijklmnopqrstuvwxyz'
+                     'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+
+class Token(object):
+    def __init__(self, kind, value, newline=False):
+        self.kind = kind
+        self.value = value
+        # Whether the whitespace or comment contains a line terminator.
+        self.newline = newline
+
+    def __repr__(self):
+        return 'Token(%s, %r)' % (self.kind, self.value)
+
+
+def _regexp_allowed(prev):
+    """ Return whether a '/' after the given significant token starts a
+        regular expression literal instead of a division.
+    """
+    if prev is None:
+        return True
+    if prev.kind == NAME:
+        return prev.value in _REGEXP_KEYWORDS
+    if prev.kind == PUNCTUATOR:
+        return prev.value not in (')', ']', '++', '--')
+    return False
+
+
+def _scan_template(code, pos):
+    """ Return the end position of the template literal starting at pos. """
+    pos += 1
+    while pos < len(code):
+        char = code[pos]
+        if char == '\\':
+            pos += 2
+        elif char == '`':
+            return pos + 1
+        elif code.startswith('${', pos):
+            _, pos = _tokenize(code, pos + 2, in_template=True)
+            pos += 1
+        else:
+            pos += 1
+
+    raise ValueError('Unterminated template literal')
+
+
+def _tokenize(code, pos=0, in_template=False):
+    tokens = []
+    prev = None
+    depth = 0
+
+    while pos < len(code):
+        char = code[pos]
+
+        match = _WHITESPACE_RE.match(code, pos)
+        if match:
+            text = match.group(0)
+            kind = NEWLINE if ('\n' in text or '\r' in text) else WHITESPACE
+            tokens.append(Token(kind, text, kind == NEWLINE))
+            pos = match.end()
+            continue
+
+        if code.startswith('//', pos):
+            match = _LINE_COMMENT_RE.match(code, pos)
+            tokens.append(Token(COMMENT, match.group(0)))
+            pos = match.end()
+            continue
+
+        if code.startswith('/*', pos):
+            match = _BLOCK_COMMENT_RE.match(code, pos)
+            if not match:
+                raise ValueError('Unterminated comment')
+            text = match.group(0)
+            tokens.append(Token(COMMENT, text, '\n' in text or '\r' in text))
+            pos = match.end()
+            continue
+
+        if char == '/' and _regexp_allowed(prev):
+            match = _REGEXP_RE.match(code, pos)
+            if not match:
+                raise ValueError('Invalid regular expression literal')
+            token = Token(REGEXP, match.group(0))
+        elif char in '"\'':
+            match = _STRING_RE.match(code, pos)
+            if not match:
+                raise ValueError('Unterminated string literal')
+            token = Token(STRING, match.group(0))
+        elif char == '`':
+            end = _scan_template(code, pos)
+            token = Token(TEMPLATE, code[pos:end])
+        else:
+            match = (_NUMBER_RE.match(code, pos) or
+                     _NAME_RE.match(code, pos) or
+                     _PUNCTUATOR_RE.match(code, pos))
+            if not match:
+                raise ValueError('Unexpected character %r' % char)
+
+            text = match.group(0)
+            if match.re is _NUMBER_RE:
+                token = Token(NUMBER, text)
+            elif match.re is _NAME_RE:
+                token = Token(NAME, text)
+            else:
+                token = Token(PUNCTUATOR, text)
+
+                if in_template:
+                    if text == '{':
+                        depth += 1
+                    elif text == '}':
+                        if depth == 0:
+                            return tokens, pos
+                        depth -= 1
+
+        tokens.append(token)
+        prev = token
+        pos += len(token.value)
+
+    if in_template:
+        raise ValueError('Unterminated template literal')
+
+    return tokens, pos
+
+
+def tokenize(code):
+    """ Split the given JavaScript source into a list of tokens,
+        including whitespace and comments.
+    """
+    return _tokenize(code)[0]
+
+
+def _line_break_required(prev, token):
+    """ Return whether a line break between two significant tokens must be
+        kept to preserve automatic semicolon insertion.
+    """
+    if prev.kind == PUNCTUATOR and prev.value in _NO_STATEMENT_END:
+        return False
+    if token.kind == PUNCTUATOR and token.value in _NO_STATEMENT_START:
+        return False
+    return True
+
+
+def _is_word_char(char):
+    return char.isalnum() or char in '_$\\' or ord(char) > 0x7f
+
+
+def _space_required(left, right):
+    """ Return whether the text of two adjacent tokens must be separated
+        to keep them as two tokens.
+    """
+    last = left[-1]
+    first = right[0]
+
+    if _is_word_char(last) and _is_word_char(first):
+        return True
+    if last in '+-' and first == last:
+        return True
+    # Avoid creating comments and HTML-like comments.
+    if last == '/' and first in '/*':
+        return True
+    if last == '<' and first == '!':
+        return True
+    if last == '-' and first == '>':
+        return True
+    # A '.' after an integer literal would be read as a decimal point.
+    if first == '.' and left.isdigit():
+        return True
+    return False
+
+
+class _Scope(object):
+    def __init__(self, parent):
+        self.parent = parent
+        self.declared = {}
+
+    def resolve(self, name):
+        scope = self
+        while scope is not None:
+            if name in scope.declared:
+                return scope
+            scope = scope.parent
+        return None
+
+
+class _Frame(object):
+    """ Brace nesting level used during the scope analysis. """
+    def __init__(self, kind, scope):
+        self.kind = kind
+        self.scope = scope
+        self.depth = 0
+        self.ternary = 0
+        # Whether the last ':' belonged to a conditional operator.
+        self.ternary_colon = False
+
+
+class _Renamer(object):
+    """ Collect the function scopes of a token list and the local names
+        declared in them.
+    """
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.global_scope = _Scope(None)
+        self.scopes = []
+        # Token index -> scope where the name is referenced.
+        self.references = {}
+        # Token indices of object literal shorthand properties.
+        self.shorthands = set()
+        # Names which must never be renamed.
+        self.fixed_names = set()
+        # Token indices already processed as declarations.
+        self.skip = set()
+
+    def _error(self):
+        raise _UnsupportedCode()
+
+    def analyze(self):
+        tokens = self.tokens
+        frames = [_Frame('block', self.global_scope)]
+        pending_function = None
+        # (brace level, bracket depth) of the active var statement.
+        var_depth = None
+        prev = None
+        line_break = False
+
+        for idx, token in enumerate(tokens):
+            if token.kind in (WHITESPACE, NEWLINE, COMMENT):
+                line_break = line_break or token.newline
+                continue
+
+            frame = frames[-1]
+            scope = frame.scope
+            value = token.value
+            next_idx = self._next(idx)
+            next_token = self.tokens[next_idx] if next_idx else None
+
+            # A var statement ended by automatic semicolon insertion.
+            if (var_depth is not None and line_break and
+                _line_break_required(prev, token) and
+                not _is_name(prev, 'var')):
+                var_depth = None
+            line_break = False
+
+            if token.kind == TEMPLATE and '${' in value:
+                self._error()
+
+            if token.kind == PUNCTUATOR:
+                if value in _UNSUPPORTED_PUNCTUATORS:
+                    self._error()
+
+                if value == '{':
+                    if pending_function is not None:
+                        frames.append(_Frame('function', pending_function))
+                        pending_function = None
+                    else:
+                        frames.append(_Frame(self._brace_kind(prev, frame),
+                                             scope))
+                elif value == '}':
+                    if len(frames) == 1:
+                        self._error()
+                    frames.pop()
+                    if var_depth is not None and len(frames) < var_depth[0]:
+                        var_depth = None
+                elif value in ('(', '['):
+                    frame.depth += 1
+                elif value in (')', ']'):
+                    frame.depth -= 1
+                    if (var_depth is not None and
+                        var_depth == (len(frames), frame.depth + 1)):
+                        var_depth = None
+                elif value == '?':
+                    frame.ternary += 1
+                elif value == ':':
+                    frame.ternary_colon = frame.ternary > 0
+                    if frame.ternary:
+                        frame.ternary -= 1
+                elif value == ';':
+                    if var_depth == (len(frames), frame.depth):
+                        var_depth = None
+
+            elif token.kind == NAME and idx not in self.skip:
+                if _is_punctuator(prev, '.'):
+                    pass
+                elif self._is_property_key(idx, prev, frame):
+                    if self._is_accessor(idx):
+                        pass
+                    elif _is_punctuator(next_token, '('):
+                        pending_function = self._parameters(next_idx, scope)
+                    elif _is_punctuator(next_token, ',', '}'):
+                        self.shorthands.add(idx)
+                        self.references[idx] = scope
+                elif value in _UNSUPPORTED_NAMES:
+                    self._error()
+                elif value == 'function':
+                    pending_function = self._function(idx, prev, scope)
+                elif value == 'var':
+                    var_depth = (len(frames), frame.depth)
+                    self._declare(next_idx, scope)
+                elif value == 'catch':
+                    self._fixed_parameter(idx)
+                elif value in _RESERVED_WORDS:
+                    pass
+                elif _is_name(prev, 'break', 'continue'):
+                    # Label reference.
+                    self.fixed_names.add(value)
+                elif (_is_punctuator(next_token, ':') and
+                      not frame.ternary and self._is_label(prev)):
+                    self.fixed_names.add(value)
+                else:
+                    self.references[idx] = scope
+
+                    if (var_depth == (len(frames), frame.depth) and
+                        _is_punctuator(prev, ',')):
+                        self._declare(idx, scope)
+
+            prev = token
+
+        if len(frames) != 1 or pending_function is not None:
+            self._error()
+
+    def _brace_kind(self, prev, frame):
+        if prev is None:
+            return 'block'
+        if prev.kind == PUNCTUATOR:
+            if prev.value in (';', '{', '}', ')'):
+                return 'block'
+            if prev.value == ':' and frame.kind != 'object':
+                return 'object' if frame.ternary_colon else 'block'
+            return 'object'
+        if prev.kind == NAME and prev.value in ('else', 'do', 'try',
+                                                'finally'):
+            return 'block'
+        if prev.kind == NAME and prev.value in _REGEXP_KEYWORDS:
+            return 'object'
+        return 'block'
+
+    def _is_property_key(self, idx, prev, frame):
+        if frame.kind != 'object' or frame.depth != 0:
+            return False
+        if _is_punctuator(prev, '{', ','):
+            return True
+        # The name of a getter or setter.
+        return (_is_name(prev, 'get', 'set') and
+                self._is_accessor(self._previous(idx)))
+
+    def _is_accessor(self, idx):
+        """ Return whether the name at idx is the 'get' or 'set' keyword of
+            an accessor property.
+        """
+        token = self.tokens[idx]
+        next_idx = self._next(idx)
+        return (token.value in ('get', 'set') and next_idx is not None and
+                self.tokens[next_idx].kind in (NAME, STRING, NUMBER))
+
+    def _is_label(self, prev):
+        return prev is None or _is_punctuator(prev, ';', '{', '}')
+
+    def _next(self, idx):
+        idx += 1
+        while idx < len(self.tokens):
+            if self.tokens[idx].kind not in (WHITESPACE, NEWLINE, COMMENT):
+                return idx
+            idx += 1
+        return None
+
+    def _previous(self, idx):
+        idx -= 1
+        while idx >= 0:
+            if self.tokens[idx].kind not in (WHITESPACE, NEWLINE, COMMENT):
+                return idx
+            idx -= 1
+        return None
+
+    def _declare(self, idx, scope):
+        if idx is None or self.tokens[idx].kind != NAME:
+            self._error()
+        if scope is not self.global_scope:
+            scope.declared.setdefault(self.tokens[idx].value, None)
+
+    def _function(self, idx, prev, scope):
+        """ Process a function keyword and return the scope of its body. """
+        name_idx = self._next(idx)
+        if name_idx is None:
+            self._error()
+
+        if self.tokens[name_idx].kind != NAME:
+            return self._parameters(name_idx, scope)
+
+        if _is_statement_start(prev):
+            # Function declaration: the name belongs to the outer scope.
+            self._declare(name_idx, scope)
+            self.references[name_idx] = scope
+        else:
+            # The name of a function expression is only visible inside
+            # the function, it is never renamed.
+            self.fixed_names.add(self.tokens[name_idx].value)
+        self.skip.add(name_idx)
+
+        return self._parameters(self._next(name_idx), scope)
+
+    def _parameters(self, paren_idx, scope):
+        """ Declare the parameters starting at the given '(' token in a new
+            function scope.
+        """
+        function_scope = _Scope(scope)
+        self.scopes.append(function_scope)
+
+        if paren_idx is None or not _is_punctuator(self.tokens[paren_idx],
+                                                   '('):
+            self._error()
+
+        idx = self._next(paren_idx)
+        expect_name = True
+        while idx is not None:
+            token = self.tokens[idx]
+            if _is_punctuator(token, ')'):
+                break
+            if expect_name and token.kind == NAME:
+                function_scope.declared.setdefault(token.value, None)
+                self.references[idx] = function_scope
+                self.skip.add(idx)
+            elif not expect_name and _is_punctuator(token, ','):
+                pass
+            else:
+                self._error()
+            expect_name = not expect_name
+            idx = self._next(idx)
+
+        return function_scope
+
+    def _fixed_parameter(self, idx):
+        """ Exclude the parameter of a catch clause from renaming. """
+        paren_idx = self._next(idx)
+        name_idx = None if paren_idx is None else self._next(paren_idx)
+        if name_idx is None or self.tokens[name_idx].kind != NAME:
+            self._error()
+        self.fixed_names.add(self.tokens[name_idx].value)
+        self.skip.add(name_idx)
+
+
+class _UnsupportedCode(Exception):
+    pass
+
+
+def _is_punctuator(token, *values):
+    return (token is not None and token.kind == PUNCTUATOR and
+            token.value in values)
+
+
+def _is_name(token, *values):
+    return token is not None and token.kind == NAME and token.value in values
+
+
+def _is_statement_start(prev):
+    """ Return whether a token after prev starts a new statement instead of
+        continuing an expression.
+    """
+    if prev is None:
+        return True
+    if prev.kind == PUNCTUATOR:
+        return prev.value in (';', '{', '}', ')', ']')
+    if prev.kind == NAME:
+        return (prev.value not in _REGEXP_KEYWORDS or
+                prev.value in ('else', 'do'))
+    return True
+
+
+def _short_names():
+    """ Generate the sequence a, b, ..., Z, aa, ab, ... """
+    length = 1
+    while True:
+        indices = [0] * length
+        while True:
+            yield ''.join(_SHORT_NAME_CHARS[i] for i in indices)
+            pos = length - 1
+            while pos >= 0 and indices[pos] == len(_SHORT_NAME_CHARS) - 1:
+                indices[pos] = 0
+                pos -= 1
+            if pos < 0:
+                break
+            indices[pos] += 1
+        length += 1
+
+
+def _rename_locals(tokens):
+    """ Assign short names to the local variables and parameters of every
+        function. Return a dict of token index -> new text, or an empty
+        dict when the code uses constructs the renaming does not support.
+    """
+    renamer = _Renamer(tokens)
+    try:
+        renamer.analyze()
+    except _UnsupportedCode:
+        return {}
+
+    used_names = set(token.value for token in tokens if token.kind == NAME)
+    used_names |= _RESERVED_WORDS
+
+    # Scopes are created in source order, so parents are always
+    # processed before their children.
+    for scope in renamer.scopes:
+        taken = set()
+        parent = scope.parent
+        while parent is not None:
+            taken.update(new for new in parent.declared.values() if new)
+            parent = parent.parent
+
+        names = _short_names()
+        for name in sorted(scope.declared):
+            if name in renamer.fixed_names:
+                scope.declared[name] = None
+                continue
+            new_name = next(names)
+            while new_name in used_names or new_name in taken:
+                new_name = next(names)
+            scope.declared[name] = new_name
+            taken.add(new_name)
+
+    replacements = {}
+    for idx, scope in renamer.references.items():
+        name = tokens[idx].value
+        owner = scope.resolve(name)
+        if owner is None or not owner.declared[name]:
+            continue
+
+        new_name = owner.declared[name]
+        if idx in renamer.shorthands:
+            new_name = '%s:%s' % (name, new_name)
+        replacements[idx] = new_name
+
+    return replacements
+
+
+def minify(code, rename_locals=False):
+    """ Return the given JavaScript source without comments and needless
+        whitespace. Line breaks are only kept where automatic semicolon
+        insertion may depend on them.
+
+        If rename_locals is set the local variables and parameters of the
+        functions are replaced with short names.
+    """
+    tokens = tokenize(code)
+    replacements = _rename_locals(tokens) if rename_locals else {}
+
+    output = []
+    prev = None
+    prev_text = None
+    line_break = False
+
+    for idx, token in enumerate(tokens):
+        if token.kind in (WHITESPACE, NEWLINE, COMMENT):
+            line_break = line_break or token.newline
+            continue
+
+        text = replacements.get(idx, token.value)
+        if prev is not None:
+            if line_break and _line_break_required(prev, token):
+                output.append('\n')
+            elif _space_required(prev_text, text):
+                output.append(' ')
+
+        output.append(text)
+        prev = token
+        prev_text = text
+        line_break = False
+
+    return ''.join(output)
@@ -0,0 +1,129 @@
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" LZSS compression of the embedded JS modules.
+
+The format must be kept in sync with the decoder in src/iotjs_lz.c.
+
+The stream is a sequence of groups. Each group starts with a flag byte
+followed by up to eight items, the lowest bit of the flag byte describes
+the first item. A zero bit is a literal byte, a one bit is a back
+reference of two bytes:
+
+    byte 0: distance - 1, low 8 bits
+    byte 1: distance - 1, high 4 bits | (length - MIN_MATCH), 4 bits
+
+If the length field is 15 an extra byte follows and is added to the
+length. The decoder stops when the expected number of bytes is produced.
+"""
+
+MIN_MATCH = 3
+MAX_MATCH = MIN_MATCH + 15 + 255
+WINDOW_SIZE = 1 << 12
+
+# Number of candidate positions examined for each match.
+MAX_CHAIN = 64
+
+
+def compress(data):
+    """ Compress the given bytes and return the compressed bytearray. """
+    data = bytearray(data)
+    size = len(data)
+    output = bytearray()
+    # Three byte prefix -> positions where it occurred, newest last.
+    chains = {}
+
+    flag_pos = 0
+    flag_bit = 8
+    pos = 0
+
+    while pos < size:
+        if flag_bit == 8:
+            flag_pos = len(output)
+            output.append(0)
+            flag_bit = 0
+
+        best_length = 0
+        best_distance = 0
+        key = bytes(data[pos:pos + MIN_MATCH])
+        candidates = chains.get(key, ())
+        limit = min(MAX_MATCH, size - pos)
+
+        for candidate in reversed(candidates[-MAX_CHAIN:]):
+            distance = pos - candidate
+            if distance > WINDOW_SIZE:
+                break
+            length = MIN_MATCH
+            while (length < limit and
+                   data[candidate + length] == data[pos + length]):
+                length += 1
+            if length > best_length:
+                best_length = length
+                best_distance = distance
+                if length == limit:
+                    break
+
+        if best_length >= MIN_MATCH:
+            output[flag_pos] |= 1 << flag_bit
+            distance = best_distance - 1
+            length = best_length - MIN_MATCH
+            output.append(distance & 0xff)
+            output.append(((distance >> 8) << 4) | min(length, 15))
+            if length >= 15:
+                output.append(length - 15)
+            step = best_length
+        else:
+            output.append(data[pos])
+            step = 1
+
+        for i in range(pos, min(pos + step, size - MIN_MATCH + 1)):
+            chains.setdefault(bytes(data[i:i + MIN_MATCH]), []).append(i)
+
+        pos += step
+        flag_bit += 1
+
+    return output
+
+
+def decompress(data, size):
+    """ Reference decoder: return the first `size` decompressed bytes. """
+    data = bytearray(data)
+    output = bytearray()
+    pos = 0
+    flags = 0
+    bits = 0
+
+    while len(output) < size:
+        if bits == 0:
+            flags = data[pos]
+            pos += 1
+            bits = 8
+
+        if flags & 1:
+            distance = (data[pos] | ((data[pos + 1] >> 4) << 8)) + 1
+            length = (data[pos + 1] & 0x0f) + MIN_MATCH
+            pos += 2
+            if length == MIN_MATCH + 15:
+                length += data[pos]
+                pos += 1
+            for _ in range(length):
+                output.append(output[-distance])
+        else:
+            output.append(data[pos])
+            pos += 1
+
+        flags >>= 1
+        bits -= 1
+
+    return output
@@ -0,0 +1,194 @@
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Helpers of the benchmark tools: running a process while measuring its
+wall time, CPU time and peak RSS, selecting the tests to measure, and simple
+statistics of the samples.
+"""
+
+import json
+import math
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from collections import OrderedDict
+from common_py import path
+from common_py.system.filesystem import FileSystem as fs
+from common_py.system.platform import Platform
+
+try:
+    monotonic = time.monotonic
+except AttributeError:
+    # Python 2 has no monotonic clock.
+    monotonic = time.time
+
+# The JerryScript heap peak printed by the binaries built with memstat.
+HEAP_PEAK_PATTERN = re.compile(r'Peak allocated = (\d+) bytes')
+
+# The measured processes run in their own process group, so that the
+# processes they start are killed together with them.
+if sys.version_info >= (3, 2):
+    NEW_PROCESS_GROUP = {"start_new_session": True}
+else:
+    NEW_PROCESS_GROUP = {"preexec_fn": os.setsid}
+
+
+class Measurement(object):
+    """ Result of a measured run. The times are in seconds, the peak RSS
+        is in kilobytes.
+    """
+
+    def __init__(self, exitcode, output, wall_time, cpu_time, peak_rss,
+                 timed_out=False):
+        self.exitcode = exitcode
+        self.output = output
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.peak_rss = peak_rss
+        self.timed_out = timed_out
+
+
+def read_output(stream, chunks):
+    """ Collect the output of a process until the end of the stream. """
+    fileno = stream.fileno()
+    chunk = os.read(fileno, 4096)
+    while chunk:
+        chunks.append(chunk)
+        chunk = os.read(fileno, 4096)
+
+
+def signal_group(process, sig):
+    """ Send the signal to the process group of the process. """
+    try:
+        os.killpg(process.pid, sig)
+    except OSError:
+        # The group is already gone.
+        pass
+
+
+def stop_process(process, grace_period):
+    """ Terminate the process group of the process, and kill it if the
+        process is still running after the grace period.
+    """
+    signal_group(process, signal.SIGTERM)
+    deadline = monotonic() + grace_period
+    while process.poll() is None and monotonic() < deadline:
+        time.sleep(0.01)
+    if process.poll() is None:
+        signal_group(process, signal.SIGKILL)
+
+
+def peak_rss_kb(rusage):
+    # Darwin reports the size in bytes, Linux in kilobytes.
+    if sys.platform == "darwin":
+        return rusage.ru_maxrss // 1024
+    return rusage.ru_maxrss
+
+
+def run_measured(cmd, cwd=None, timeout=None):
+    """ Run the command until it exits and return its Measurement. The
+        standard error is part of the output. The process is killed after
+        `timeout` seconds.
+    """
+    start = monotonic()
+    process = subprocess.Popen(cmd, cwd=cwd,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT,
+                               **NEW_PROCESS_GROUP)
+
+    timed_out = []
+    def kill():
+        timed_out.append(True)
+        signal_group(process, signal.SIGKILL)
+
+    timer = None
+    if timeout is not None:
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+
+    output = process.stdout.read()
+    process.stdout.close()
+    # The timer must not kill the group after the process was waited for,
+    # its id may belong to another group by then.
+    if timer:
+        timer.cancel()
+        timer.join()
+
+    # The process is waited for here instead of by Popen to get its
+    # resource usage.
+    _, status, rusage = os.wait4(process.pid, 0)
+    wall_time = monotonic() - start
+
+    if os.WIFSIGNALED(status):
+        process.returncode = -os.WTERMSIG(status)
+    else:
+        process.returncode = os.WEXITSTATUS(status)
+
+    return Measurement(process.returncode, output, wall_time,
+                       rusage.ru_utime + rusage.ru_stime,
+                       peak_rss_kb(rusage), bool(timed_out))
+
+
+def load_run_pass_tests():
+    """ Return the tests of the run_pass testset of testsets.json which are
+        not skipped on this platform.
+    """
+    with open(fs.join(path.TEST_ROOT, 'testsets.json')) as testsets_file:
+        testsets = json.load(testsets_file, object_pairs_hook=OrderedDict)
+
+    skipped = set(['all', Platform().os()])
+    return [test for test in testsets['run_pass']
+            if not skipped.intersection(test.get('skip', []))]
+
+
+def percentile(values, percent):
+    """ Return the nearest-rank percentile of the values. """
+    ordered = sorted(values)
+    rank = int(math.ceil(percent / 100.0 * len(ordered)))
+    return ordered[max(rank, 1) - 1]
+
+
+def median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2.0
+
+
+def mean(values):
+    return sum(values) / float(len(values))
+
+
+def stdev(values):
+    """ Return the sample standard deviation of the values. """
+    if len(values) < 2:
+        return 0.0
+    average = mean(values)
+    return math.sqrt(sum((value - average) ** 2 for value in values) /
+                     (len(values) - 1))
+
+
+def relative_change(base, new):
+    """ Return the change from base to new in percent, or None if the base
+        is zero.
+    """
+    if not base:
+        return None
+    return (new - base) * 100.0 / base
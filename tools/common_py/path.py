@@ -57,3 +57,9 @@ BUILD_CONFIG_PATH = fs.join(PROJECT_ROOT, 'build.config')
 
 # IoT.js build information.
 BUILD_INFO_PATH = fs.join(TEST_ROOT, 'tools', 'iotjs_build_info.js')
+
+# Runs several tests in one iotjs process for the testrunner.
+BATCH_RUNNER_PATH = fs.join(TEST_ROOT, 'tools', 'iotjs_batch_runner.js')
+
+# Measures the JavaScript coverage of a test for the testrunner.
+COVERAGE_RUNNER_PATH = fs.join(TEST_ROOT, 'tools', 'iotjs_coverage_runner.js')
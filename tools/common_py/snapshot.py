@@ -0,0 +1,121 @@
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Reader of the JerryScript snapshot format.
+
+Only the snapshot version of the bundled JerryScript (13) is read, the
+layout of other versions is not checked, so their snapshots are rejected.
+
+The snapshot starts with the following header (native byte order):
+
+    uint32_t magic
+    uint32_t version
+    uint32_t global flags
+    uint32_t literal table offset
+    uint32_t number of functions
+    uint32_t function offsets[number of functions]
+
+The literal table is a sequence of entries, each of them is a uint16_t
+length followed by the characters of the literal padded to an even size.
+
+The buffer is never copied, the literals are returned as memoryview
+slices of the snapshot data.
+"""
+
+import struct
+
+JERRY_SNAPSHOT_MAGIC = 0x5952524A
+
+# Snapshot version of the bundled JerryScript, the only one whose layout
+# is confirmed to match the above.
+JERRY_SNAPSHOT_VERSION = 13
+
+_HEADER = struct.Struct('=IIIII')
+_UINT16 = struct.Struct('=H')
+_UINT32 = struct.Struct('=I')
+
+# Size of the field at the start of the literal table which is not part
+# of the literal entries.
+_LITERAL_TABLE_HEADER_SIZE = 4
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class Snapshot(object):
+    """ Parsed header of a snapshot, the literals are read on demand. """
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+
+        if len(self.data) < _HEADER.size:
+            raise SnapshotError('Snapshot is too short (%d bytes)'
+                                % len(self.data))
+
+        (magic, self.version, self.global_flags, self.literal_table_offset,
+         self.function_count) = _HEADER.unpack_from(self.data)
+
+        if magic != JERRY_SNAPSHOT_MAGIC:
+            raise SnapshotError('Incorrect snapshot format! '
+                                'Magic number is incorrect')
+        if self.version != JERRY_SNAPSHOT_VERSION:
+            raise SnapshotError('Please check jerry snapshot version '
+                                '%d (Last confirmed: %d)' %
+                                (self.version, JERRY_SNAPSHOT_VERSION))
+        if self.literal_table_offset > len(self.data):
+            raise SnapshotError('Literal table offset %d is out of the '
+                                'snapshot (%d bytes)' %
+                                (self.literal_table_offset, len(self.data)))
+
+    @staticmethod
+    def from_file(snapshot_path):
+        with open(snapshot_path, 'rb') as fsnapshot:
+            return Snapshot(fsnapshot.read())
+
+    def function_offsets(self):
+        """ Return the offsets of the functions stored in the snapshot. """
+        return [_UINT32.unpack_from(self.data, _HEADER.size + idx * 4)[0]
+                for idx in range(self.function_count)]
+
+    def iter_literals(self):
+        """ Yield the literals of the literal table as memoryview slices.
+            Empty entries are skipped.
+        """
+        data = self.data
+        size = len(data)
+        pos = self.literal_table_offset + _LITERAL_TABLE_HEADER_SIZE
+
+        while pos + _UINT16.size <= size:
+            length = _UINT16.unpack_from(data, pos)[0]
+            pos += _UINT16.size
+            if length == 0:
+                continue
+            if pos + length > size:
+                raise SnapshotError('Literal at offset %d is truncated'
+                                    % (pos - _UINT16.size))
+            yield data[pos:pos + length]
+            pos += length + (length % 2)
+
+    def literals(self, max_length=None):
+        """ Return the literals as a list of strings, optionally only the
+            ones shorter than `max_length`.
+        """
+        return [literal.tobytes().decode('utf-8')
+                for literal in self.iter_literals()
+                if max_length is None or len(literal) < max_length]
+
+    @property
+    def literal_count(self):
+        return sum(1 for _ in self.iter_literals())
@@ -44,6 +44,7 @@
 
 
 import codecs
+import contextlib
 import errno
 import filecmp
 import glob
@@ -381,5 +382,31 @@ class FileSystem(object):
         return os.path.splitext(path)
 
     @staticmethod
-    def compare(path1, path2):
-        return filecmp.cmp(path1, path2)
+    def compare(path1, path2, shallow=True):
+        return filecmp.cmp(path1, path2, shallow)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def atomic_write(path, mode='w', only_if_changed=False):
+        """Open a temporary file for writing the new contents of the given
+        file, which atomically replaces the file on exit. An interrupted or
+        concurrent writer never leaves a partially written file behind.
+
+        Args:
+            only_if_changed: if True, the file is only replaced if its
+                contents changed, so an unchanged file keeps its
+                modification time.
+        """
+        temp_path = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            with open(temp_path, mode) as temp_file:
+                yield temp_file
+
+            if (only_if_changed and os.path.exists(path) and
+                    filecmp.cmp(temp_path, path, False)):
+                os.remove(temp_path)
+            else:
+                os.rename(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
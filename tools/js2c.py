@@ -18,75 +18,90 @@
 # And this file also generates magic string list in src/iotjs_string_ext.inl.h
 # file to reduce JerryScript heap usage.
 
+import collections
+import hashlib
+import io
+import json
+import multiprocessing
 import os
 import re
+import shutil
 import subprocess
-import struct
 
 from common_py.system.filesystem import FileSystem as fs
+from common_py import js_minifier
+from common_py import lz
+from common_py.measure import monotonic
 from common_py import path
+from common_py import snapshot
 
-def regroup(l, n):
-    return [l[i:i+n] for i in range(0, len(l), n)]
+# Default location of the content-addressed snapshot cache.
+SNAPSHOT_CACHE_DIR = fs.join(path.BUILD_ROOT, 'js2c_cache')
 
+# The least recently used snapshots are removed from the cache above
+# this total size.
+SNAPSHOT_CACHE_MAX_SIZE = 32 * 1024 * 1024
 
-def remove_comments(code):
-    pattern = r'(\".*?\"|\'.*?\')|(/\*.*?\*/|//[^\r\n]*$)'
-    regex = re.compile(pattern, re.MULTILINE | re.DOTALL)
 
-    def _replacer(match):
-        if match.group(2) is not None:
-            return ""
-        else:
-            return match.group(1)
+def read_snapshot(code):
+    """ Parse the header of the given snapshot, exit on malformed input. """
+    try:
+        return snapshot.Snapshot(code)
+    except snapshot.SnapshotError as e:
+        print("%s%s%s" % ("\033[1;31m", e, "\033[0m"))
+        exit(1)
 
-    return regex.sub(_replacer, code)
 
+def parse_literals(code):
+    """ Return the set of the literals shorter than 32 characters in the
+        literal table of the given snapshot.
+    """
+    if not isinstance(code, snapshot.Snapshot):
+        code = read_snapshot(code)
+    return set(code.literals(max_length=32))
 
-def remove_whitespaces(code):
-    return re.sub('\n+', '\n', re.sub('\n +', '\n', code))
 
+def select_magic_strings(literals, literal_counts, budget=None):
+    """ Select the snapshot literals that become external magic strings.
 
-def force_str(string):
-    if not isinstance(string, str):
-        return string.decode('utf-8')
-    else:
-        return string
+        The literals are ranked by the number of modules using them
+        multiplied by their length, which approximates the heap bytes
+        saved at runtime. Literals are taken in this order as long as
+        they still fit into `budget` bytes in total (all of them if the
+        budget is None). Return the ranked list of (literal, count, selected).
+    """
+    ranked = sorted(literals,
+                    key=lambda x: (-literal_counts[x] * len(x), len(x), x))
 
+    result = []
+    used = 0
+    for literal in ranked:
+        selected = budget is None or used + len(literal) <= budget
+        if selected:
+            used += len(literal)
+        result.append((literal, literal_counts[literal], selected))
 
-def parse_literals(code):
-    JERRY_SNAPSHOT_VERSION = 13
-    JERRY_SNAPSHOT_MAGIC = 0x5952524A
-
-    literals = set()
-    # header format:
-    # uint32_t magic
-    # uint32_t version
-    # uint32_t global opts
-    # uint32_t literal table offset
-    header = struct.unpack('I' * 4, code[0:4 * 4])
-    if header[0] != JERRY_SNAPSHOT_MAGIC:
-        print('Incorrect snapshot format! Magic number is incorrect')
-        exit(1)
-    if header[1] != JERRY_SNAPSHOT_VERSION:
-        print ('Please check jerry snapshot version (Last confirmed: %d)'
-               % JERRY_SNAPSHOT_VERSION)
-        exit(1)
-
-    code_ptr = header[3] + 4
+    return result
 
-    while code_ptr < len(code):
-        length = struct.unpack('H', code[code_ptr : code_ptr + 2])[0]
-        code_ptr = code_ptr + 2
-        if length == 0:
-            continue
-        if length < 32:
-            item = struct.unpack('%ds' % length,
-                                 code[code_ptr : code_ptr + length])
-            literals.add(force_str(item[0]))
-        code_ptr = code_ptr + length + (length % 2)
 
-    return literals
+def print_magic_string_report(ranked, budget):
+    """ Print the ranked snapshot literals and whether they were selected
+        as external magic strings.
+    """
+    print('%-4s %-32s %6s %6s %6s %s' %
+          ('#', 'Literal', 'Length', 'Count', 'Score', 'Selected'))
+    selected_count = 0
+    selected_size = 0
+    for idx, (literal, count, selected) in enumerate(ranked):
+        print('%-4d %-32s %6d %6d %6d %s' %
+              (idx + 1, repr(literal)[1:-1], len(literal), count,
+               count * len(literal), 'yes' if selected else 'no'))
+        if selected:
+            selected_count += 1
+            selected_size += len(literal)
+    print('Selected %d of %d literals, %d bytes (budget: %s)' %
+          (selected_count, len(ranked), selected_size,
+           'unlimited' if budget is None else '%d bytes' % budget))
 
 
 LICENSE = '''
@@ -157,8 +172,27 @@ MODULE_VARIABLES_C = '''
 const size_t {NAME}_l = SIZE_{NAME_UPPER};
 const char {NAME}_n[] = "{NAME}";
 const uint8_t {NAME}_s[] = {{
-{CODE}
-}};
+'''
+
+MODULE_VARIABLES_C_END = '''
+};
+'''
+
+# The snapshots are executed in place, so they must be word aligned.
+# JerryScript reads the snapshots as uint32_t arrays.
+SPLIT_SNAPSHOT_ALIGNED_C = '''
+#ifdef __GNUC__
+#define IOTJS_SNAPSHOT_ALIGNED __attribute__((aligned(4)))
+#else
+#define IOTJS_SNAPSHOT_ALIGNED
+#endif
+'''
+
+SPLIT_SNAPSHOT_VARIABLES_C = '''
+#define SIZE_{NAME_UPPER} {SIZE}
+const size_t {NAME}_l = SIZE_{NAME_UPPER};
+const char {NAME}_n[] = "{NAME}";
+const uint8_t {NAME}_s[] IOTJS_SNAPSHOT_ALIGNED = {{
 '''
 
 NATIVE_STRUCT_H = '''
@@ -171,6 +205,39 @@ typedef struct {
 extern const iotjs_js_module_t js_modules[];
 '''
 
+SPLIT_SNAPSHOT_STRUCT_H = '''
+#define IOTJS_JS_MODULES_SPLIT_SNAPSHOT
+''' + NATIVE_STRUCT_H
+
+COMPRESSED_MODULE_VARIABLES_H = '''
+extern const char {NAME}_n[];
+extern const uint8_t {NAME}_s[];
+extern const size_t {NAME}_l;
+extern const size_t {NAME}_c;
+'''
+
+COMPRESSED_MODULE_VARIABLES_C = '''
+#define SIZE_{NAME_UPPER} {SIZE}
+#define COMPRESSED_SIZE_{NAME_UPPER} {COMPRESSED_SIZE}
+const size_t {NAME}_l = SIZE_{NAME_UPPER};
+const size_t {NAME}_c = COMPRESSED_SIZE_{NAME_UPPER};
+const char {NAME}_n[] = "{NAME}";
+const uint8_t {NAME}_s[] = {{
+'''
+
+COMPRESSED_NATIVE_STRUCT_H = '''
+#define IOTJS_JS_MODULES_COMPRESSED
+
+typedef struct {
+  const char* name;
+  const void* code;
+  const size_t length;
+  const size_t compressed_length;
+} iotjs_js_module_t;
+
+extern const iotjs_js_module_t js_modules[];
+'''
+
 NATIVE_STRUCT_C = '''
 const iotjs_js_module_t js_modules[] = {{
 {MODULES}
@@ -178,22 +245,75 @@ const iotjs_js_module_t js_modules[] = {{
 '''
 
 
-def hex_format(ch):
-    if isinstance(ch, str):
-        ch = ord(ch)
+# Hex representation of every byte value as it appears in the C arrays.
+HEX_TABLE = ['0x%02x, ' % byte for byte in range(256)]
+
+# Number of bytes written per line of a C array.
+BYTES_PER_LINE = 10
 
-    return "0x{:02x}".format(ch)
+# Number of bytes converted at once by write_code.
+BYTES_PER_CHUNK = BYTES_PER_LINE * 4096
 
 
-def format_code(code, indent):
-    lines = []
-    # convert all characters to hex format
-    converted_code = map(hex_format, code)
-    # 10 hex number per line
-    for line in regroup(", ".join(converted_code), 10 * 6):
-        lines.append(('  ' * indent) + line.strip())
+def write_code(fout, code, indent):
+    """ Write the given bytes as the body of a C array, 10 hex numbers
+        per line. The bytes are converted in fixed-size chunks so the
+        memory usage does not depend on the size of the code.
+    """
+    prefix = '  ' * indent
+    line_length = len(HEX_TABLE[0]) * BYTES_PER_LINE
+    view = memoryview(code)
+    size = len(code)
+
+    for start in range(0, size, BYTES_PER_CHUNK):
+        end = min(start + BYTES_PER_CHUNK, size)
+        hex_code = ''.join(map(HEX_TABLE.__getitem__,
+                               bytearray(view[start:end])))
+        if end == size:
+            # No separator after the last element.
+            hex_code = hex_code[:-2]
+
+        # Each line is written without the space after its last comma.
+        fout.write('\n'.join(prefix + hex_code[i:i + line_length - 1]
+                             for i in range(0, len(hex_code), line_length)))
+        if end != size:
+            fout.write('\n')
+
+
+def write_module_variables(fout_c, name, code, template=MODULE_VARIABLES_C):
+    """ Write the C variables holding the given module code. """
+    fout_c.write(template.format(NAME=name, NAME_UPPER=name.upper(),
+                                 SIZE=len(code)))
+    write_code(fout_c, code, 1)
+    fout_c.write(MODULE_VARIABLES_C_END)
+
+
+def write_compressed_module_variables(fout_c, name, size, compressed):
+    """ Write the C variables holding the given compressed module code.
+        The size is the number of bytes the code decompresses to.
+    """
+    fout_c.write(COMPRESSED_MODULE_VARIABLES_C.format(
+        NAME=name, NAME_UPPER=name.upper(), SIZE=size,
+        COMPRESSED_SIZE=len(compressed)))
+    write_code(fout_c, compressed, 1)
+    fout_c.write(MODULE_VARIABLES_C_END)
+
+
+def compress_code(code):
+    """ Compress the given module code and check that it decompresses to
+        the original. Return the compressed code, the size of the original
+        code in bytes and the time of its decompression in milliseconds.
+    """
+    compressed = bytes(lz.compress(code))
+    start = monotonic()
+    decompressed = bytes(lz.decompress(compressed, len(code)))
+    decode_time = (monotonic() - start) * 1000
+    if decompressed != code:
+        print("%s%s%s" % ("\033[1;31m", "Failed to compress module code",
+                          "\033[0m"))
+        exit(1)
 
-    return "\n".join(lines)
+    return compressed, len(code), decode_time
 
 
 def merge_snapshots(snapshot_infos, snapshot_tool):
@@ -211,29 +331,70 @@ def merge_snapshots(snapshot_infos, snapshot_tool):
     for item in snapshot_infos:
         fs.remove(item['path'])
 
-    with open(output_path, 'rb') as snapshot:
-        code = snapshot.read()
+    with open(output_path, 'rb') as fsnapshot:
+        code = fsnapshot.read()
 
     fs.remove(output_path)
     return code
 
 
-def get_snapshot_contents(js_path, snapshot_tool):
-    """ Convert the given module with the snapshot generator
-        and return the resulting bytes.
+def get_tool_digest(snapshot_tool):
+    """ Return a digest identifying the given snapshot tool binary. """
+    digest = hashlib.sha1()
+    with open(snapshot_tool, 'rb') as ftool:
+        for chunk in iter(lambda: ftool.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def wrap_module(js_path):
+    """ Return the source of the given module wrapped into a function
+        (except the iotjs module itself) as bytes.
+    """
+    module_name = os.path.splitext(os.path.basename(js_path))[0]
+
+    with open(js_path, 'rb') as fmodule:
+        code = fmodule.read()
+
+    if module_name != "iotjs":
+        code = (b"(function(exports, require, module, native) {\n" +
+                code + b"});\n")
+
+    return code
+
+
+def generate_snapshot(js_path, snapshot_tool, cache_dir=None,
+                      tool_digest=None):
+    """ Convert the given module with the snapshot generator.
+        Return the path of the resulting snapshot and the exit code
+        of the snapshot tool.
+
+        If cache_dir is given the snapshot is looked up by the hash of the
+        wrapped source, the snapshot tool and the snapshot version, and
+        the snapshot tool is only invoked when the lookup fails.
     """
     wrapped_path = js_path + ".wrapped"
     snapshot_path = js_path + ".snapshot"
-    module_name = os.path.splitext(os.path.basename(js_path))[0]
+    wrapped_code = wrap_module(js_path)
+
+    cache_path = None
+    if cache_dir:
+        if tool_digest is None:
+            tool_digest = get_tool_digest(snapshot_tool)
 
-    with open(wrapped_path, 'w') as fwrapped, open(js_path, "r") as fmodule:
-        if module_name != "iotjs":
-            fwrapped.write("(function(exports, require, module, native) {\n")
+        key = hashlib.sha1(wrapped_code)
+        key.update(tool_digest.encode('ascii'))
+        key.update(str(snapshot.JERRY_SNAPSHOT_VERSION).encode('ascii'))
+        cache_path = fs.join(cache_dir, key.hexdigest() + '.snapshot')
 
-        fwrapped.write(fmodule.read())
+        if fs.exists(cache_path):
+            # The modification time tells which entries were used last.
+            os.utime(cache_path, None)
+            fs.copyfile(cache_path, snapshot_path)
+            return snapshot_path, 0
 
-        if module_name != "iotjs":
-            fwrapped.write("});\n")
+    with open(wrapped_path, 'wb') as fwrapped:
+        fwrapped.write(wrapped_code)
 
     ret = subprocess.call([snapshot_tool,
                            "generate",
@@ -242,30 +403,321 @@ def get_snapshot_contents(js_path, snapshot_tool):
 
     fs.remove(wrapped_path)
     if ret != 0:
-        msg = "Failed to dump %s: - %d" % (js_path, ret)
-        print("%s%s%s" % ("\033[1;31m", msg, "\033[0m"))
-        fs.remove(snapshot_path)
+        if fs.exists(snapshot_path):
+            fs.remove(snapshot_path)
+        return snapshot_path, ret
+
+    if cache_path:
+        fs.maybe_make_directory(cache_dir)
+        with fs.atomic_write(cache_path, 'wb') as fcache, \
+             open(snapshot_path, 'rb') as fsnapshot:
+            shutil.copyfileobj(fsnapshot, fcache)
+
+    return snapshot_path, 0
+
+
+def prune_snapshot_cache(cache_dir, max_size=SNAPSHOT_CACHE_MAX_SIZE):
+    """ Remove the least recently used snapshots from the cache until its
+        total size is at most max_size. The snapshots of the current run
+        were used last, so they are removed last.
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.snapshot'):
+            entry_path = fs.join(cache_dir, name)
+            try:
+                entries.append((os.path.getmtime(entry_path),
+                                fs.getsize(entry_path), entry_path))
+            except OSError:
+                # Removed by a concurrent build.
+                pass
+
+    total_size = 0
+    for mtime, size, entry_path in sorted(entries, reverse=True):
+        total_size += size
+        if total_size > max_size:
+            try:
+                os.remove(entry_path)
+            except OSError:
+                pass
+
+
+def _generate_snapshot_worker(args):
+    return generate_snapshot(*args)
+
+
+def get_snapshot_contents(js_paths, snapshot_tool, cache_dir=None,
+                          tool_digest=None, jobs=1):
+    """ Convert the given modules with the snapshot generator using
+        at most `jobs` parallel processes and return the paths of the
+        resulting snapshots in the order of `js_paths`.
+    """
+    tasks = [(js_path, snapshot_tool, cache_dir, tool_digest)
+             for js_path in js_paths]
+
+    if jobs > 1 and len(tasks) > 1:
+        pool = multiprocessing.Pool(processes=min(jobs, len(tasks)))
+        try:
+            results = pool.map(_generate_snapshot_worker, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_generate_snapshot_worker(task) for task in tasks]
+
+    if cache_dir and fs.exists(cache_dir):
+        prune_snapshot_cache(cache_dir)
+
+    failed = False
+    for js_path, (snapshot_path, ret) in zip(js_paths, results):
+        if ret != 0:
+            msg = "Failed to dump %s: - %d" % (js_path, ret)
+            print("%s%s%s" % ("\033[1;31m", msg, "\033[0m"))
+            failed = True
+
+    if failed:
+        for snapshot_path, ret in results:
+            if ret == 0:
+                fs.remove(snapshot_path)
         exit(1)
 
-    return snapshot_path
+    return [snapshot_path for snapshot_path, ret in results]
 
 
-def get_js_contents(js_path, is_debug_mode=False):
-    """ Read the contents of the given js module. """
-    with open(js_path, "r") as f:
+def get_js_contents(js_path, is_debug_mode=False, rename_locals=False):
+    """ Read the contents of the given js module. Return the code as UTF-8
+        bytes, so the embedded array and its size agree.
+    """
+    with io.open(js_path, "r", encoding="utf-8") as f:
          code = f.read()
 
     # minimize code when in release mode
     if not is_debug_mode:
-        code = remove_comments(code)
-        code = remove_whitespaces(code)
-    return code
+        try:
+            code = js_minifier.minify(code, rename_locals)
+        except ValueError as err:
+            msg = "Failed to minify %s: %s" % (js_path, err)
+            print("%s%s%s" % ("\033[1;31m", msg, "\033[0m"))
+            exit(1)
+    return code.encode('utf-8')
+
+
+def print_size_report(sizes):
+    """ Print the source, the processed and the embedded size of each
+        module in bytes. For compressed modules the time of decompressing
+        them with common_py/lz.py is printed too, which is proportional to
+        the time the runtime spends on it.
+    """
+    compressed = any('decode_time' in item for item in sizes)
+    row = "%-30s %10s %10s %10s %7s"
+    header = ("Module", "Source", "Code", "Embedded", "Ratio")
+    if compressed:
+        row += " %12s"
+        header += ("Decode (ms)",)
+    print(row % header)
+
+    total = {'source': 0, 'code': 0, 'embedded': 0}
+    if compressed:
+        total['decode_time'] = 0
+    for item in sizes + [dict(total, name='Total')]:
+        if item['name'] != 'Total':
+            for key in total:
+                total[key] += item[key]
+        else:
+            item = dict(total, name='Total')
+        ratio = 100.0 * item['embedded'] / max(item['source'], 1)
+        values = (item['name'], item['source'], item['code'],
+                  item['embedded'], '%.1f%%' % ratio)
+        if compressed:
+            values += ('%.2f' % item['decode_time'],)
+        print(row % values)
+
+
+REPORT_COLUMNS = [
+    ('source', 'Source'),
+    ('minified', 'Minified'),
+    ('snapshot', 'Snapshot'),
+    ('embedded', 'Embedded'),
+    ('literals', 'Literals'),
+    ('magic_strings', 'Magic strings'),
+    ('magic_string_bytes', 'Magic string bytes'),
+]
+
+
+def make_report(buildtype, no_snapshot, rename_locals, modules, module_sizes,
+                module_literals, magic_string_set, merged_size):
+    """ Collect the sizes of each module and their share of the external
+        magic string table into a report dictionary.
+    """
+    items = []
+    for (name, js_path), sizes in zip(modules, module_sizes):
+        if no_snapshot and buildtype == 'release':
+            minified = sizes['code']
+        else:
+            minified = len(get_js_contents(js_path, False, rename_locals))
+
+        literals = module_literals.get(name)
+        if literals is not None:
+            literals = literals & magic_string_set
+
+        items.append({
+            'name': name,
+            'source': sizes['source'],
+            'minified': minified,
+            'snapshot': None if no_snapshot else sizes['code'],
+            'embedded': sizes['embedded'],
+            'literals': sizes.get('literals'),
+            'magic_strings': None if literals is None else len(literals),
+            'magic_string_bytes':
+                None if literals is None else sum(map(len, literals)),
+        })
+
+    total = {'name': 'Total'}
+    for key, title in REPORT_COLUMNS:
+        values = [item[key] for item in items if item[key] is not None]
+        total[key] = sum(values) if values else None
+
+    magic_strings = None
+    magic_string_bytes = None
+    if not no_snapshot:
+        magic_strings = len(magic_string_set)
+        magic_string_bytes = sum(map(len, magic_string_set))
+
+    return {
+        'buildtype': buildtype,
+        'mode': 'no-snapshot' if no_snapshot else 'snapshot',
+        'modules': items,
+        'total': total,
+        'merged_snapshot': merged_size,
+        'magic_strings': magic_strings,
+        'magic_string_bytes': magic_string_bytes,
+    }
+
+
+def load_report(report_path):
+    """ Load a JSON report written by a previous js2c run. """
+    try:
+        with open(report_path, 'r') as freport:
+            return json.load(freport)
+    except (IOError, ValueError) as e:
+        msg = "Failed to load report %s: %s" % (report_path, e)
+        print("%s%s%s" % ("\033[1;31m", msg, "\033[0m"))
+        exit(1)
+
 
+def compare_reports(report, base_report):
+    """ Add the difference to the base report to each module of the report
+        and return the names of the modules whose embedded size grew.
+    """
+    base_modules = dict((item['name'], item)
+                        for item in base_report['modules'])
+    grown = []
+    for item in report['modules'] + [report['total']]:
+        if item['name'] == 'Total':
+            base = base_report['total']
+        else:
+            base = base_modules.get(item['name'])
+        if base is None:
+            item['delta'] = None
+            continue
+
+        item['delta'] = dict((key, item[key] - base[key])
+                             for key, title in REPORT_COLUMNS
+                             if item.get(key) is not None and
+                                base.get(key) is not None)
+        if (item['name'] != 'Total' and
+                item['delta'].get('embedded', 0) > 0):
+            grown.append(item['name'])
+
+    report['removed'] = sorted(set(base_modules) -
+                               set(item['name'] for item in report['modules']))
+    return grown
+
+
+def format_markdown_report(report):
+    """ Return the report as a Markdown table. """
+    has_delta = 'removed' in report
+
+    def cell(item, key):
+        if item.get(key) is None:
+            return '-'
+        if not has_delta or not item.get('delta'):
+            return str(item[key])
+        delta = item['delta'].get(key)
+        if not delta:
+            return str(item[key])
+        return '%d (%+d)' % (item[key], delta)
+
+    lines = ['# JS modules (%s, %s)' % (report['mode'], report['buildtype']),
+             '']
+    lines.append('| Module | %s |' %
+                 ' | '.join(title for key, title in REPORT_COLUMNS))
+    lines.append('|:---' + '|---:' * len(REPORT_COLUMNS) + '|')
+    for item in report['modules'] + [report['total']]:
+        name = item['name']
+        if has_delta and item.get('delta') is None:
+            name += ' (new)'
+        lines.append('| %s | %s |' %
+                     (name, ' | '.join(cell(item, key)
+                                       for key, title in REPORT_COLUMNS)))
+
+    if report['magic_strings'] is not None:
+        lines.extend(['', 'Magic strings: %d (%d bytes)' %
+                      (report['magic_strings'], report['magic_string_bytes'])])
+    if report.get('removed'):
+        lines.extend(['', 'Removed modules: %s' %
+                      ', '.join(report['removed'])])
+    return '\n'.join(lines) + '\n'
+
+
+def write_report(report, report_path, base_path=None):
+    """ Write the per-module report as JSON, or as Markdown if the file name
+        ends with .md. If base_path is given the report is compared with
+        that previous JSON report and the modules which grew are printed.
+    """
+    if base_path:
+        grown = compare_reports(report, load_report(base_path))
+        for name in grown:
+            delta = [item['delta']['embedded'] for item in report['modules']
+                     if item['name'] == name][0]
+            msg = "Module %s grew by %d bytes" % (name, delta)
+            print("%s%s%s" % ("\033[1;33m", msg, "\033[0m"))
+
+    with open(report_path, 'w') as freport:
+        if report_path.endswith('.md'):
+            freport.write(format_markdown_report(report))
+        else:
+            json.dump(report, freport, indent=2, sort_keys=True)
+            freport.write('\n')
+
+
+def update_file(file_path):
+    """ Open a temporary file for writing the new contents of the given
+        file. The file is atomically replaced on exit only if its contents
+        changed, so that unchanged outputs keep their modification time.
+    """
+    return fs.atomic_write(file_path, only_if_changed=True)
 
-def js2c(buildtype, js_modules, snapshot_tool=None, verbose=False):
+
+def js2c(buildtype, js_modules, snapshot_tool=None, verbose=False,
+         cache_dir=None, jobs=1, rename_locals=False, size_report=False,
+         compress=False, magic_string_budget=None,
+         magic_string_report=False, report=None, report_base=None,
+         split_snapshot=False):
     is_debug_mode = (buildtype == "debug")
     no_snapshot = (snapshot_tool == None)
+    compress = compress and no_snapshot
+    split_snapshot = split_snapshot and not no_snapshot
     magic_string_set = set()
+    # Number of module snapshots referencing each literal.
+    literal_counts = collections.Counter()
+    # Literals (as selectable for the magic strings) of each module snapshot.
+    module_literals = {}
+    merged_size = None
+
+    tool_digest = None
+    if not no_snapshot and cache_dir:
+        tool_digest = get_tool_digest(snapshot_tool)
 
     str_const_regex = re.compile('^#define IOTJS_MAGIC_STRING_\w+\s+"(\w+)"$')
     with open(fs.join(path.SRC_ROOT, 'iotjs_magic_strings.in'), 'r') as fin_h:
@@ -275,41 +727,86 @@ def js2c(buildtype, js_modules, snapshot_tool=None, verbose=False):
                 magic_string_set.add(result.group(1))
 
     # generate the code for the modules
-    with open(fs.join(path.SRC_ROOT, 'iotjs_js.h'), 'w') as fout_h, \
-         open(fs.join(path.SRC_ROOT, 'iotjs_js.c'), 'w') as fout_c:
+    with update_file(fs.join(path.SRC_ROOT, 'iotjs_js.h')) as fout_h, \
+         update_file(fs.join(path.SRC_ROOT, 'iotjs_js.c')) as fout_c:
 
         fout_h.write(LICENSE)
         fout_h.write(HEADER1)
         fout_c.write(LICENSE)
         fout_c.write(HEADER2)
+        if split_snapshot:
+            fout_c.write(SPLIT_SNAPSHOT_ALIGNED_C)
+
+        modules = [module.split('=', 1) for module in sorted(js_modules)]
+
+        # Snapshots are generated up front (possibly in parallel), the
+        # merge order and the module indices follow the sorted module list.
+        if not no_snapshot:
+            snapshot_paths = get_snapshot_contents(
+                [js_path for name, js_path in modules], snapshot_tool,
+                cache_dir, tool_digest, jobs)
 
         snapshot_infos = []
         js_module_names = []
-        for idx, module in enumerate(sorted(js_modules)):
-            [name, js_path] = module.split('=', 1)
+        module_sizes = []
+        for idx, [name, js_path] in enumerate(modules):
             js_module_names.append(name)
             if verbose:
                 print('Processing module: %s' % name)
 
             if no_snapshot:
-                code = get_js_contents(js_path, is_debug_mode)
-                code_string = format_code(code, 1)
-
-                fout_h.write(MODULE_VARIABLES_H.format(NAME=name))
-                fout_c.write(MODULE_VARIABLES_C.format(NAME=name,
-                                                       NAME_UPPER=name.upper(),
-                                                       SIZE=len(code),
-                                                       CODE=code_string))
+                code = get_js_contents(js_path, is_debug_mode, rename_locals)
+                sizes = {'name': name, 'source': fs.getsize(js_path),
+                         'code': len(code), 'embedded': len(code)}
+
+                if compress:
+                    compressed, size, decode_time = compress_code(code)
+                    sizes['embedded'] = len(compressed)
+                    sizes['decode_time'] = decode_time
+
+                    fout_h.write(COMPRESSED_MODULE_VARIABLES_H.format(
+                        NAME=name))
+                    write_compressed_module_variables(fout_c, name, size,
+                                                      compressed)
+                else:
+                    fout_h.write(MODULE_VARIABLES_H.format(NAME=name))
+                    write_module_variables(fout_c, name, code)
+                module_sizes.append(sizes)
             else:
-                code_path = get_snapshot_contents(js_path, snapshot_tool)
-                info = {'name': name, 'path': code_path, 'idx': idx}
+                info = {'name': name, 'path': snapshot_paths[idx], 'idx': idx}
                 snapshot_infos.append(info)
-
-                fout_h.write(MODULE_SNAPSHOT_VARIABLES_H.format(NAME=name))
-                fout_c.write(MODULE_SNAPSHOT_VARIABLES_C.format(NAME=name,
-                                                                IDX=idx))
-
-        if no_snapshot:
+                with open(info['path'], 'rb') as fsnapshot:
+                    snapshot_code = fsnapshot.read()
+                module_snapshot = read_snapshot(snapshot_code)
+                module_literals[name] = parse_literals(module_snapshot)
+                literal_counts.update(module_literals[name])
+                snapshot_size = len(snapshot_code)
+                module_sizes.append({'name': name,
+                                     'source': fs.getsize(js_path),
+                                     'code': snapshot_size,
+                                     'embedded': snapshot_size,
+                                     'literals': module_snapshot.literal_count})
+
+                if split_snapshot:
+                    # Each module keeps its own snapshot, so requiring a
+                    # module only touches the array of that module.
+                    fs.remove(info['path'])
+                    fout_h.write(MODULE_VARIABLES_H.format(NAME=name))
+                    write_module_variables(fout_c, name, snapshot_code,
+                                           SPLIT_SNAPSHOT_VARIABLES_C)
+                else:
+                    fout_h.write(MODULE_SNAPSHOT_VARIABLES_H.format(NAME=name))
+                    fout_c.write(MODULE_SNAPSHOT_VARIABLES_C.format(NAME=name,
+                                                                    IDX=idx))
+
+        if compress:
+            modules_struct = [
+               '  {{ {0}_n, {0}_s, SIZE_{1}, COMPRESSED_SIZE_{1} }},'.format(
+                   name, name.upper())
+               for name in sorted(js_module_names)
+            ]
+            modules_struct.append('  { NULL, NULL, 0, 0 }')
+        elif no_snapshot or split_snapshot:
             modules_struct = [
                '  {{ {0}_n, {0}_s, SIZE_{1} }},'.format(name, name.upper())
                for name in sorted(js_module_names)
@@ -317,23 +814,35 @@ def js2c(buildtype, js_modules, snapshot_tool=None, verbose=False):
             modules_struct.append('  { NULL, NULL, 0 }')
         else:
             code = merge_snapshots(snapshot_infos, snapshot_tool)
-            code_string = format_code(code, 1)
-            magic_string_set |= parse_literals(code)
+            merged_size = len(code)
 
             name = 'iotjs_js_modules'
             fout_h.write(MODULE_VARIABLES_H.format(NAME=name))
-            fout_c.write(MODULE_VARIABLES_C.format(NAME=name,
-                                                   NAME_UPPER=name.upper(),
-                                                   SIZE=len(code),
-                                                   CODE=code_string))
+            write_module_variables(fout_c, name, code)
             modules_struct = [
                 '  {{ module_{0}, MODULE_{0}_IDX }},'.format(info['name'])
                 for info in snapshot_infos
             ]
             modules_struct.append('  { NULL, 0 }')
 
-        if no_snapshot:
+        if not no_snapshot:
+            if split_snapshot:
+                literals = set(literal_counts)
+            else:
+                literals = parse_literals(code)
+            ranked = select_magic_strings(literals, literal_counts,
+                                          magic_string_budget)
+            if magic_string_report:
+                print_magic_string_report(ranked, magic_string_budget)
+            magic_string_set |= set(literal for literal, count, selected
+                                    in ranked if selected)
+
+        if compress:
+            native_struct_h = COMPRESSED_NATIVE_STRUCT_H
+        elif no_snapshot:
             native_struct_h = NATIVE_STRUCT_H
+        elif split_snapshot:
+            native_struct_h = SPLIT_SNAPSHOT_STRUCT_H
         else:
             native_struct_h = NATIVE_SNAPSHOT_STRUCT_H
 
@@ -343,9 +852,18 @@ def js2c(buildtype, js_modules, snapshot_tool=None, verbose=False):
         fout_c.write(NATIVE_STRUCT_C.format(MODULES="\n".join(modules_struct)))
         fout_c.write(EMPTY_LINE)
 
+    if size_report:
+        print_size_report(module_sizes)
+
+    if report:
+        report_data = make_report(buildtype, no_snapshot, rename_locals,
+                                  modules, module_sizes, module_literals,
+                                  magic_string_set, merged_size)
+        write_report(report_data, report, report_base)
+
     # Write out the external magic strings
     magic_str_path = fs.join(path.SRC_ROOT, 'iotjs_string_ext.inl.h')
-    with open(magic_str_path, 'w') as fout_magic_str:
+    with update_file(magic_str_path) as fout_magic_str:
         fout_magic_str.write(LICENSE)
         fout_magic_str.write(MAGIC_STRINGS_HEADER)
 
@@ -374,6 +892,46 @@ if __name__ == "__main__":
         help='Executable to use for generating snapshots and merging them '
              '(ex.: the JerryScript snapshot tool). '
              'If not specified the JS files will be directly processed.')
+    parser.add_argument('--snapshot-cache', default=SNAPSHOT_CACHE_DIR,
+        metavar='DIR',
+        help='Directory of the snapshot cache. Unchanged modules reuse '
+             'their cached snapshot, the least recently used snapshots are '
+             'removed above %d MiB. Pass an empty string to disable the '
+             'cache (default: %%(default)s)'
+             % (SNAPSHOT_CACHE_MAX_SIZE // (1024 * 1024)))
+    parser.add_argument('-j', '--jobs', type=int,
+        default=multiprocessing.cpu_count(),
+        help='Number of parallel snapshot generator processes '
+             '(default: %(default)s)')
+    parser.add_argument('--rename-locals', action='store_true', default=False,
+        help='Shorten the local identifiers of the modules in release mode '
+             'without snapshot')
+    parser.add_argument('--compress', action='store_true', default=False,
+        help='Store the modules LZSS compressed, they are decompressed '
+             'when required. Only used without snapshot.')
+    parser.add_argument('--split-snapshot', action='store_true', default=False,
+        help='Store a separate snapshot for each module instead of merging '
+             'them, so only the required modules are read. '
+             'Only used with snapshot.')
+    parser.add_argument('--magic-string-budget', type=int, default=None,
+        metavar='BYTES',
+        help='Limit the total length of the snapshot literals stored as '
+             'external magic strings. The literals used by the most modules '
+             'and the longest ones are preferred (default: no limit)')
+    parser.add_argument('--magic-string-report', action='store_true',
+        default=False,
+        help='Print the ranked snapshot literals and the selected '
+             'magic strings')
+    parser.add_argument('--report', default=None, metavar='FILE',
+        help='Write the size, literal and magic string statistics of each '
+             'module to FILE, as Markdown if it ends with .md and as JSON '
+             'otherwise')
+    parser.add_argument('--report-base', default=None, metavar='FILE',
+        help='Compare the --report with a previous JSON report and print '
+             'the modules which grew')
+    parser.add_argument('--size-report', action='store_true', default=False,
+        help='Print the source and the embedded size of each module, and '
+             'the decompression time of the compressed modules')
     parser.add_argument('-v', '--verbose', default=False,
         help='Enable verbose output.')
 
@@ -385,4 +943,8 @@ if __name__ == "__main__":
         print('Using "%s" as snapshot tool' % options.snapshot_tool)
 
     modules = options.modules.replace(',', ' ').split()
-    js2c(options.buildtype, modules, options.snapshot_tool, options.verbose)
+    js2c(options.buildtype, modules, options.snapshot_tool, options.verbose,
+         options.snapshot_cache, options.jobs, options.rename_locals,
+         options.size_report, options.compress, options.magic_string_budget,
+         options.magic_string_report, options.report, options.report_base,
+         options.split_snapshot)
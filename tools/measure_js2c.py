@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Measure the throughput of the C array writer of js2c on random input of
+the given size, as found in the merged snapshot of a big module bundle. The
+peak memory allocated by Python is reported too where tracemalloc exists.
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import tempfile
+
+from common_py.measure import median, monotonic
+from js2c import write_code
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2 has no tracemalloc.
+    tracemalloc = None
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=8,
+        help='Size of the input in MiB (default: %(default)s)')
+    parser.add_argument('--runs', type=int, default=5,
+        help='Number of runs (default: %(default)s)')
+    return parser.parse_args()
+
+
+def measure_write_code(code, output_path):
+    """ Write the code as a C array into the file and return the time it
+        took in seconds.
+    """
+    with open(output_path, 'w') as fout:
+        start = monotonic()
+        write_code(fout, code, 1)
+        return monotonic() - start
+
+
+def measure_peak_memory(code, output_path):
+    """ Return the peak memory allocated while writing the code in bytes. """
+    tracemalloc.start()
+    with open(output_path, 'w') as fout:
+        write_code(fout, code, 1)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    args = get_arguments()
+    code = os.urandom(args.size * 1024 * 1024)
+
+    output_fd, output_path = tempfile.mkstemp(suffix='.c')
+    os.close(output_fd)
+    try:
+        times = [measure_write_code(code, output_path)
+                 for _ in range(args.runs)]
+        output_size = os.path.getsize(output_path)
+        peak = None
+        if tracemalloc:
+            peak = measure_peak_memory(code, output_path)
+    finally:
+        os.remove(output_path)
+
+    write_time = median(times)
+    print('Input:      %d MiB' % args.size)
+    print('Output:     %.1f MiB' % (output_size / 1024.0 / 1024.0))
+    print('Time:       %.3f s (median of %d runs)' % (write_time, args.runs))
+    print('Throughput: %.1f MiB/s' % (args.size / write_time))
+    if peak is not None:
+        print('Peak memory: %.1f MiB' % (peak / 1024.0 / 1024.0))
+
+
+if __name__ == '__main__':
+    main()
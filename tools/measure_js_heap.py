@@ -17,13 +17,24 @@
 from __future__ import print_function
 
 import argparse
+import json
+import multiprocessing
+import multiprocessing.pool
 import os
-import re
-import subprocess
 import sys
 
+from collections import OrderedDict
 from common_py import path
-from common_py.system.filesystem import FileSystem as fs
+from common_py.measure import HEAP_PEAK_PATTERN, load_run_pass_tests
+from common_py.measure import median, relative_change
+from common_py.measure import run_measured, stdev
+
+# Measured values of a run and their titles.
+METRICS = OrderedDict([
+    ('heap', 'JS heap peak (bytes)'),
+    ('rss', 'Peak RSS (KB)'),
+    ('time', 'Wall time (ms)')
+])
 
 def get_arguments():
     parser = argparse.ArgumentParser()
@@ -31,46 +42,207 @@ def get_arguments():
         help='Path to the base IoT.js binary')
     parser.add_argument('--new',  required=True,
         help='Path to the new IoT.js binary')
+    parser.add_argument('--runs', type=int, default=5,
+        help='Number of runs of each test with each binary '
+             '(default: %(default)s)')
+    parser.add_argument('-j', '--jobs', type=int,
+        default=multiprocessing.cpu_count(),
+        help='Number of tests measured in parallel (default: %(default)s)')
+    parser.add_argument('--threshold', type=float, default=5.0,
+        metavar='PERCENT',
+        help='Increase of a gated value which is a regression '
+             '(default: %(default)s)')
+    parser.add_argument('--gate', nargs='+', choices=list(METRICS),
+        default=['heap', 'rss'],
+        help='Values whose regression fails the comparison '
+             '(default: %(default)s)')
+    parser.add_argument('--timeout', type=int, default=300,
+        metavar='SECONDS',
+        help='Default timeout of a run, tests with a timeout in '
+             'testsets.json use their own (default: %(default)s)')
+    parser.add_argument('--output-json', metavar='FILE',
+        help='Write the results to FILE as JSON')
 
     script_args = parser.parse_args()
+    if script_args.runs < 1:
+        parser.error('--runs must be at least 1')
+    if script_args.timeout < 1:
+        parser.error('--timeout must be at least 1')
 
     return script_args
 
-def run_iotjs(cmd):
-    pattern = re.compile(r'Peak allocated = (\d+) bytes')
+def run_iotjs(cmd, timeout):
+    """ Run iotjs once. Return the measured values, or None if the run
+        failed or timed out.
+    """
+    result = run_measured(cmd, cwd=path.TEST_ROOT, timeout=timeout)
+    if result.timed_out or result.exitcode != 0:
+        return None
+
+    # The heap is only reported by the binaries built with memstat.
+    match = HEAP_PEAK_PATTERN.search(result.output.decode('utf8', 'replace'))
+
+    return {
+        'heap': int(match.group(1)) if match else None,
+        'rss': result.peak_rss,
+        'time': result.wall_time * 1000
+    }
+
+
+def measure_test(binaries, test, runs, timeout):
+    """ Run the test with both binaries, interleaved. Return the samples
+        of each binary and the number of its failed runs.
+    """
+    test_file = test['name']
+    timeout = test.get('timeout', timeout)
+    samples = dict((name, dict((metric, []) for metric in METRICS))
+                   for name in binaries)
+    failures = dict((name, 0) for name in binaries)
+
+    for run in range(runs):
+        for name, iotjs in binaries.items():
+            values = run_iotjs([iotjs, '--memstat',
+                                os.path.join(path.RUN_PASS_DIR, test_file)],
+                               timeout)
+            if values is None:
+                failures[name] += 1
+                continue
+            for metric, value in values.items():
+                if value is not None:
+                    samples[name][metric].append(value)
+
+    return samples, failures
+
+
+def compare(base, new, threshold):
+    """ Compare the samples of a value. Return the statistics and whether
+        the value regressed: its median grew more than the threshold and
+        every new sample is bigger than every base sample, so the change
+        is not just noise.
+    """
+    if not base or not new:
+        return None
+
+    change = relative_change(median(base), median(new))
+    regression = (change is not None and change > threshold and
+                  min(new) > max(base))
+    return OrderedDict([
+        ('base', median(base)),
+        ('base_stdev', round(stdev(base), 2)),
+        ('new', median(new)),
+        ('new_stdev', round(stdev(new), 2)),
+        ('delta', median(new) - median(base)),
+        ('change', None if change is None else round(change, 2)),
+        ('regression', regression)
+    ])
+
+
+def format_value(value, deviation):
+    if deviation:
+        return '%.1f (&plusmn;%.1f)' % (value, deviation)
+    return '%.1f' % value
+
+
+def print_tables(results, gates):
+    for metric, title in METRICS.items():
+        rows = [(test_file, result['values'][metric])
+                for test_file, result in results.items()
+                if result['values'].get(metric)]
+        if not rows:
+            continue
+
+        gated = ' (gated)' if metric in gates else ''
+        print('\n**%s%s**\n' % (title, gated))
+        print('| {0:^40} | {1:^20} | {2:^20} | {3:^10} | {4:^8} |'.format(
+            'Test file', 'base', 'new', 'delta', 'change'))
+        print('| {0} | {1} | {2} | {3} | {4} |'.format(
+            '-'*40, '-'*20, '-'*20, '-'*10, '-'*8))
+
+        for test_file, value in rows:
+            if value['change'] is None:
+                change = '-'
+            else:
+                change = '%+.1f%%' % value['change']
+            if value['regression'] and metric in gates:
+                change = '**%s**' % change
+            print('| {0:40} | {1:>20} | {2:>20} | {3:>10} | {4:>8} |'.format(
+                test_file,
+                format_value(value['base'], value['base_stdev']),
+                format_value(value['new'], value['new_stdev']),
+                '%+.1f' % value['delta'], change))
 
-    try:
-        output = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
-    except subprocess.CalledProcessError as err:
-        return ""
 
-    match = pattern.search(str(output))
+if __name__ == "__main__":
+    script_args = get_arguments()
+
+    binaries = OrderedDict([
+        ('base', script_args.base),
+        ('new', script_args.new)
+    ])
+    tests = sorted(load_run_pass_tests(), key=lambda test: test['name'])
+    serial_tests = [test for test in tests if test.get('serial', False)]
+    other_tests = [test for test in tests if not test.get('serial', False)]
 
-    if match:
-        return match.group(1)
-    else:
-        return ""
+    def measure(test):
+        return measure_test(binaries, test, script_args.runs,
+                            script_args.timeout)
 
+    # The serial tests (e.g. listening on a fixed port) are measured alone.
+    measurements = dict((test['name'], measure(test))
+                        for test in serial_tests)
 
-if __name__ == "__main__":
-    script_args = get_arguments()
-    print("**JS heap peak (bytes)**\n")
-    print("| {0:^40} | {1:^10} | {2:^10} |".format("Test file", "base", "new"))
-    print("| {0} | {1} | {2} |".format("-"*40, "-"*10, "-"*10))
-
-    for test_file in os.listdir(path.RUN_PASS_DIR):
-        if test_file.endswith(".js"):
-            line = "| " + test_file + " | "
-            cmd = [script_args.base, '--memstat',
-                os.path.join(path.RUN_PASS_DIR, test_file)
-            ]
-            base_out = run_iotjs(cmd)
-
-            cmd = [script_args.new, '--memstat',
-                os.path.join(path.RUN_PASS_DIR, test_file)
-            ]
-            new_out = run_iotjs(cmd)
-
-            if base_out or new_out:
-                print("| {0:40} | {1:^10} | {2:^10} |"
-                    .format(test_file, base_out, new_out))
+    pool = multiprocessing.pool.ThreadPool(max(script_args.jobs, 1))
+    try:
+        for test, measurement in zip(other_tests,
+                                     pool.map(measure, other_tests)):
+            measurements[test['name']] = measurement
+    finally:
+        pool.close()
+        pool.join()
+
+    results = OrderedDict()
+    regressions = []
+    for test_file in [test['name'] for test in tests]:
+        samples, failures = measurements[test_file]
+        values = OrderedDict()
+        for metric in METRICS:
+            values[metric] = compare(samples['base'][metric],
+                                     samples['new'][metric],
+                                     script_args.threshold)
+            if (values[metric] and values[metric]['regression'] and
+                metric in script_args.gate):
+                regressions.append((test_file, metric,
+                                    values[metric]['change']))
+        results[test_file] = OrderedDict([
+            ('failures', failures),
+            ('values', values)
+        ])
+
+    print_tables(results, script_args.gate)
+
+    failed = [(test_file, name, count)
+              for test_file, result in results.items()
+              for name, count in result['failures'].items() if count]
+    if failed:
+        print('\n**Failed runs**\n')
+        for test_file, name, count in failed:
+            print('* %s: %d of %d runs failed or timed out with %s'
+                  % (test_file, count, script_args.runs, name))
+
+    if script_args.output_json:
+        report = OrderedDict([
+            ('binaries', binaries),
+            ('runs', script_args.runs),
+            ('threshold', script_args.threshold),
+            ('timeout', script_args.timeout),
+            ('gate', script_args.gate),
+            ('results', results)
+        ])
+        with open(script_args.output_json, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if regressions:
+        print('\n**Regressions over %s%%**\n' % script_args.threshold)
+        for test_file, metric, change in regressions:
+            print('* %s: %s %+.1f%%' % (test_file, METRICS[metric], change))
+        sys.exit(1)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Measure the startup latency of the iotjs binary: the time of running an
+empty script, of requiring each builtin module and of requiring the basic
+and the core module groups. Each script runs many times, the median and the
+95th percentile of the wall time, the CPU time and the peak RSS are
+reported. The peak RSS of these short scripts is the RSS after the startup.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+
+from collections import OrderedDict
+from common_py import path
+from common_py.measure import median, percentile, relative_change
+from common_py.measure import run_measured
+from common_py.system.filesystem import FileSystem as fs
+from common_py.system.executor import Executor as ex
+
+# Module groups of src/modules.json which are measured together.
+MODULE_GROUPS = OrderedDict([
+    ("basic", "iotjs_basic_modules"),
+    ("core", "iotjs_core_modules")
+])
+
+METRICS = OrderedDict([
+    ("wall_time", "Wall time (ms)"),
+    ("cpu_time", "CPU time (ms)"),
+    ("peak_rss", "Peak RSS (KB)")
+])
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--base', required=True,
+        help='Path to the base IoT.js binary')
+    parser.add_argument('--new',
+        help='Path to the new IoT.js binary, compared with the base')
+    parser.add_argument('--runs', type=int, default=20,
+        help='Number of runs of each script (default: %(default)s)')
+    parser.add_argument('--warmup', type=int, default=1,
+        help='Number of runs of each script before the measurement '
+             '(default: %(default)s)')
+    parser.add_argument('--timeout', type=int, default=60,
+        metavar='SECONDS',
+        help='Kill a run which has not exited after this time, it is '
+             'counted as failed (default: %(default)s)')
+    parser.add_argument('--output-json', metavar='FILE',
+        help='Write the results to FILE as JSON')
+
+    script_args = parser.parse_args()
+    if script_args.runs < 1:
+        parser.error('--runs must be at least 1')
+    if script_args.timeout < 1:
+        parser.error('--timeout must be at least 1')
+
+    return script_args
+
+
+def get_builtins(iotjs):
+    output = ex.check_run_cmd_output(iotjs, [path.BUILD_INFO_PATH],
+                                     quiet=True)
+    if not isinstance(output, str):
+        output = output.decode('utf8')
+    return set(json.loads(output)['builtins'])
+
+
+def generate_scripts(script_dir):
+    """ Write the measured scripts into the directory. Return the path of
+        each script and the modules it requires, by script name.
+    """
+    with open(fs.join(path.SRC_ROOT, 'modules.json')) as modules_file:
+        modules = json.load(modules_file)['modules']
+
+    group_modules = set(MODULE_GROUPS.values())
+    scripts = OrderedDict()
+    scripts['empty'] = []
+    for name in sorted(modules):
+        if name not in group_modules:
+            scripts['require_%s' % name] = [name]
+    for group, module in MODULE_GROUPS.items():
+        scripts['group_%s' % group] = modules[module]['require']
+
+    script_paths = OrderedDict()
+    for name, required in scripts.items():
+        script_path = fs.join(script_dir, name + '.js')
+        with open(script_path, 'w') as script_file:
+            for module in required:
+                script_file.write("require('%s');\n" % module)
+        script_paths[name] = (script_path, required)
+
+    return script_paths
+
+
+def summarize(values):
+    if not values:
+        return None
+    return OrderedDict([
+        ('median', round(median(values), 3)),
+        ('p95', round(percentile(values, 95), 3))
+    ])
+
+
+def measure(binaries, scripts, runs, warmup, timeout):
+    """ Run every script with every binary. The runs of the binaries are
+        interleaved, so a change in the load of the machine affects all of
+        them in the same way. A run is killed after the timeout.
+    """
+    builtins = dict((name, get_builtins(iotjs))
+                    for name, iotjs in binaries.items())
+
+    samples = OrderedDict()
+    for script, (script_path, required) in scripts.items():
+        samples[script] = OrderedDict()
+        for name in binaries:
+            if set(required) <= builtins[name]:
+                samples[script][name] = {
+                    'failures': 0,
+                    'wall_time': [],
+                    'cpu_time': [],
+                    'peak_rss': []
+                }
+
+        for run in range(warmup + runs):
+            for name, iotjs in binaries.items():
+                if name not in samples[script]:
+                    continue
+
+                result = run_measured([iotjs, script_path], timeout=timeout)
+                if run < warmup:
+                    continue
+
+                sample = samples[script][name]
+                if result.exitcode != 0:
+                    sample['failures'] += 1
+                    continue
+                sample['wall_time'].append(result.wall_time * 1000)
+                sample['cpu_time'].append(result.cpu_time * 1000)
+                sample['peak_rss'].append(result.peak_rss)
+
+    results = OrderedDict()
+    for script, script_samples in samples.items():
+        results[script] = OrderedDict()
+        for name, sample in script_samples.items():
+            results[script][name] = OrderedDict(
+                [('failures', sample['failures'])] +
+                [(metric, summarize(sample[metric])) for metric in METRICS])
+    return results
+
+
+def format_value(value):
+    if value is None:
+        return '-'
+    return '%.1f' % value
+
+
+def print_tables(results, binaries):
+    for metric, title in METRICS.items():
+        print('\n**%s**\n' % title)
+
+        header = ['Script']
+        for name in binaries:
+            header += ['%s median' % name, '%s p95' % name]
+        if 'new' in binaries:
+            header.append('change')
+        print('| ' + ' | '.join(header) + ' |')
+        print('|' + '|'.join(['---'] * len(header)) + '|')
+
+        for script, script_results in results.items():
+            # The modules of the script are not built into the binaries.
+            if not script_results:
+                continue
+
+            row = [script]
+            medians = {}
+            for name in binaries:
+                stats = (script_results.get(name) or {}).get(metric)
+                if stats:
+                    medians[name] = stats['median']
+                    row += [format_value(stats['median']),
+                            format_value(stats['p95'])]
+                else:
+                    row += ['-', '-']
+            if 'new' in binaries:
+                change = None
+                if len(medians) == 2:
+                    change = relative_change(medians['base'], medians['new'])
+                row.append('-' if change is None else '%+.1f%%' % change)
+            print('| ' + ' | '.join(row) + ' |')
+
+    for script, script_results in results.items():
+        for name, result in script_results.items():
+            if result['failures']:
+                print('\n%s: %d runs of %s failed'
+                      % (name, result['failures'], script), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    script_args = get_arguments()
+
+    binaries = OrderedDict([('base', fs.abspath(script_args.base))])
+    if script_args.new:
+        binaries['new'] = fs.abspath(script_args.new)
+
+    script_dir = tempfile.mkdtemp(prefix='iotjs_startup_')
+    try:
+        scripts = generate_scripts(script_dir)
+        results = measure(binaries, scripts, script_args.runs,
+                          script_args.warmup, script_args.timeout)
+    finally:
+        shutil.rmtree(script_dir)
+
+    print_tables(results, binaries)
+
+    if script_args.output_json:
+        report = OrderedDict([
+            ('binaries', binaries),
+            ('runs', script_args.runs),
+            ('warmup', script_args.warmup),
+            ('timeout', script_args.timeout),
+            ('results', results)
+        ])
+        with open(script_args.output_json, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
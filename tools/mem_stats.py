@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Benchmark the memory usage of IoT.js: the peak of the JerryScript heap
+and the peak RSS of the process running each benchmark script.
+
+The peak RSS is taken from the resource usage of the process. The heap is
+only reported by a binary built with memory statistics (--jerry-memstat),
+which can be given with --memstat-iotjs, so the RSS is still measured with
+the normal binary.
+"""
+
+from __future__ import print_function
+
+import argparse
+import csv
+import datetime
+import json
+import multiprocessing
+import multiprocessing.pool
+import os
+import sys
+
+from collections import OrderedDict
+from common_py import path
+from common_py.measure import HEAP_PEAK_PATTERN, median, run_measured
+from common_py.system.filesystem import FileSystem as fs
+from common_py.system.executor import Executor as ex
+
+FIELDS = ['benchmark', 'heap_peak_bytes', 'rss_peak_bytes', 'failures']
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the memory usage of IoT.js')
+    parser.add_argument('iotjs',
+        help='Path to the IoT.js binary')
+    parser.add_argument('benchmarks', nargs='+', metavar='benchmark',
+        help='Paths to the JavaScript programs of the benchmark suite')
+    parser.add_argument('--memstat-iotjs', metavar='IOTJS',
+        help='Path to an IoT.js binary built with memory statistics, used '
+             'for the heap peak (default: the heap peak is measured with '
+             'IOTJS if it supports memory statistics)')
+    parser.add_argument('--runs', type=int, default=1,
+        help='Number of runs of each benchmark, the medians are reported '
+             '(default: %(default)s)')
+    parser.add_argument('-j', '--jobs', type=int,
+        default=multiprocessing.cpu_count(),
+        help='Number of benchmarks run in parallel (default: %(default)s)')
+    parser.add_argument('--format',
+        choices=['table', 'csv', 'json', 'delimited'], default='table',
+        help='Output format, delimited is the semicolon separated output '
+             'of mem_stats.sh (default: %(default)s)')
+    parser.add_argument('-d', dest='format', action='store_const',
+        const='delimited',
+        help='Same as --format=delimited')
+    parser.add_argument('--history', metavar='FILE',
+        help='Append the results with the current commit to FILE, a JSON '
+             'list of the previous results')
+    parser.add_argument('--timeout', type=int, default=300,
+        metavar='SECONDS',
+        help='Kill a run which has not exited after this time, it is '
+             'counted as failed (default: %(default)s)')
+
+    script_args = parser.parse_args()
+    if script_args.runs < 1:
+        parser.error('--runs must be at least 1')
+    if script_args.timeout < 1:
+        parser.error('--timeout must be at least 1')
+
+    # mem_stats.sh took the memstat binary as the second positional
+    # argument, which would be run as a benchmark here.
+    first = script_args.benchmarks[0]
+    if (not first.endswith('.js') and fs.isfile(first) and
+            os.access(first, os.X_OK)):
+        if script_args.memstat_iotjs or len(script_args.benchmarks) < 2:
+            parser.error('%s is an executable, not a benchmark' % first)
+        print('Using %s as --memstat-iotjs, the positional memstat binary '
+              'of mem_stats.sh is deprecated' % first, file=sys.stderr)
+        script_args.memstat_iotjs = first
+        script_args.benchmarks = script_args.benchmarks[1:]
+
+    return script_args
+
+
+def run_benchmark(iotjs, memstat_iotjs, benchmark, runs, timeout):
+    """ Run the benchmark in its own directory. Return its median heap
+        peak and RSS peak in bytes and the number of failed runs. A run is
+        killed after the timeout.
+    """
+    benchmark = fs.abspath(benchmark)
+    cwd = fs.dirname(benchmark)
+
+    heap_peaks = []
+    rss_peaks = []
+    failures = 0
+    # Without a separate memstat binary the heap peak is reported by this
+    # run, a binary without memory statistics ignores the option.
+    cmd = [iotjs, benchmark]
+    if memstat_iotjs == iotjs:
+        cmd = [iotjs, '--memstat', benchmark]
+
+    for run in range(runs):
+        result = run_measured(cmd, cwd=cwd, timeout=timeout)
+        if result.exitcode != 0:
+            failures += 1
+            continue
+        rss_peak = result.peak_rss * 1024
+
+        if memstat_iotjs != iotjs:
+            result = run_measured([memstat_iotjs, '--memstat', benchmark],
+                                  cwd=cwd, timeout=timeout)
+            if result.exitcode != 0:
+                failures += 1
+                continue
+        rss_peaks.append(rss_peak)
+
+        match = HEAP_PEAK_PATTERN.search(result.output.decode('utf8',
+                                                              'replace'))
+        if match:
+            heap_peaks.append(int(match.group(1)))
+
+    return OrderedDict([
+        ('benchmark', fs.splitext(fs.basename(benchmark))[0]),
+        ('heap_peak_bytes', median(heap_peaks) if heap_peaks else None),
+        ('rss_peak_bytes', median(rss_peaks) if rss_peaks else None),
+        ('failures', failures)
+    ])
+
+
+def print_table(results):
+    print('%30s%25s%25s' % ('Test name', 'Peak Heap (jerry)', 'Maximum RSS'))
+    print()
+    for result in results:
+        print('%30s%25s%25s' % (result['benchmark'],
+                                format_value(result['heap_peak_bytes']),
+                                format_value(result['rss_peak_bytes'])))
+
+
+def format_value(value):
+    if value is None:
+        return '-'
+    return '%d' % value
+
+
+def print_csv(results):
+    writer = csv.writer(sys.stdout, lineterminator='\n')
+    writer.writerow(FIELDS)
+    for result in results:
+        writer.writerow(['' if result[field] is None else result[field]
+                         for field in FIELDS])
+
+
+def print_delimited(results):
+    for result in results:
+        print('%s;%s;%s' % (result['benchmark'],
+                            format_value(result['heap_peak_bytes']),
+                            format_value(result['rss_peak_bytes'])))
+
+
+def get_commit():
+    """ Return the current commit of the source tree, or None outside of a
+        git repository.
+    """
+    output = ex.run_cmd_output('git', ['-C', path.PROJECT_ROOT, 'rev-parse',
+                                       '--verify', '-q', 'HEAD'], quiet=True)
+    if not isinstance(output, str):
+        output = output.decode('utf8')
+    return output.strip() or None
+
+
+def append_history(history_path, iotjs, results):
+    """ Append the results to the history file, so the memory usage of the
+        benchmarks can be followed over the commits.
+    """
+    history = []
+    if fs.exists(history_path):
+        with open(history_path) as history_file:
+            history = json.load(history_file)
+
+    history.append(OrderedDict([
+        ('commit', get_commit()),
+        ('date', datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')),
+        ('iotjs', iotjs),
+        ('results', results)
+    ]))
+
+    with fs.atomic_write(history_path) as history_file:
+        json.dump(history, history_file, indent=2)
+
+
+if __name__ == "__main__":
+    script_args = get_arguments()
+
+    iotjs = fs.abspath(script_args.iotjs)
+    memstat_iotjs = iotjs
+    if script_args.memstat_iotjs:
+        memstat_iotjs = fs.abspath(script_args.memstat_iotjs)
+
+    pool = multiprocessing.pool.ThreadPool(max(script_args.jobs, 1))
+    try:
+        results = pool.map(
+            lambda benchmark: run_benchmark(iotjs, memstat_iotjs, benchmark,
+                                            script_args.runs,
+                                            script_args.timeout),
+            script_args.benchmarks)
+    finally:
+        pool.close()
+        pool.join()
+
+    if script_args.format == 'table':
+        print_table(results)
+    elif script_args.format == 'csv':
+        print_csv(results)
+    elif script_args.format == 'delimited':
+        print_delimited(results)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if script_args.history:
+        append_history(script_args.history, iotjs, results)
+
+    # A failed run of either binary is left out of the medians.
+    failed = [result for result in results if result['failures']]
+    for result in failed:
+        print('%s: %d runs failed' % (result['benchmark'],
+                                      result['failures']),
+              file=sys.stderr)
+    if failed:
+        sys.exit(1)
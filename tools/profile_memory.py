@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Profile the memory usage of iotjs processes over time.
+
+The RSS and the size of the data segment (VmData) of the process are read
+from /proc/<pid>/status at a fixed interval while the script runs. IoT.js
+has no way to read the JerryScript heap from outside while it runs, so with
+--memstat only the heap peak printed at the exit is reported.
+
+A series grows monotonically if the medians of its consecutive windows
+never decrease and the last one is bigger than the first one by more than
+the threshold. That is a sign of a leak or of fragmentation.
+"""
+
+from __future__ import print_function
+
+import argparse
+import csv
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from collections import OrderedDict
+from common_py import path
+from common_py.measure import HEAP_PEAK_PATTERN, NEW_PROCESS_GROUP
+from common_py.measure import load_run_pass_tests
+from common_py.measure import median, monotonic, relative_change
+from common_py.measure import read_output, signal_group, stop_process
+from common_py.system.filesystem import FileSystem as fs
+from common_py.system.executor import Terminal
+
+# Fields of /proc/<pid>/status which are sampled, in kilobytes.
+STATUS_FIELDS = OrderedDict([
+    ('VmRSS', 'rss_kb'),
+    ('VmData', 'vm_data_kb')
+])
+
+# Seconds a script stopped after --duration has to exit before it is
+# killed, and to close its output.
+STOP_GRACE_PERIOD = 5
+
+# Number of windows compared when looking for monotonic growth.
+GROWTH_WINDOWS = 5
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('iotjs',
+        help='Path to the IoT.js binary')
+    parser.add_argument('scripts', nargs='*', metavar='script',
+        help='Scripts to profile (default: the tests of %s which are not '
+             'skipped in testsets.json)' % path.RUN_PASS_DIR)
+    parser.add_argument('--interval', type=float, default=0.1,
+        metavar='SECONDS',
+        help='Time between two samples (default: %(default)s)')
+    parser.add_argument('--duration', type=float, metavar='SECONDS',
+        help='Stop a script after this time (default: run until it exits)')
+    parser.add_argument('--timeout', type=float, default=300,
+        metavar='SECONDS',
+        help='Kill a script which has not exited after this time, unless '
+             '--duration is given; the tests of testsets.json use their '
+             'own timeout (default: %(default)s)')
+    parser.add_argument('--memstat', action='store_true', default=False,
+        help='Run iotjs with --memstat and report the JerryScript heap peak '
+             '(requires a build with --jerry-memstat)')
+    parser.add_argument('--growth-threshold', type=float, default=10.0,
+        metavar='PERCENT',
+        help='Growth of a series between its first and last window which '
+             'is reported if the series never decreases '
+             '(default: %(default)s)')
+    parser.add_argument('--format', choices=['csv', 'json'], default='csv',
+        help='Format of the time series (default: %(default)s)')
+    parser.add_argument('--output', metavar='FILE',
+        help='Write the time series to FILE (default: standard output)')
+
+    script_args = parser.parse_args()
+    if script_args.interval <= 0:
+        parser.error('--interval must be positive')
+    if script_args.timeout <= 0:
+        parser.error('--timeout must be positive')
+
+    return script_args
+
+
+def read_status(pid):
+    """ Return the sampled fields of the process status, or None if the
+        process is gone.
+    """
+    values = OrderedDict()
+    try:
+        with open('/proc/%d/status' % pid) as status_file:
+            for line in status_file:
+                name, _, value = line.partition(':')
+                if name in STATUS_FIELDS:
+                    values[STATUS_FIELDS[name]] = int(value.split()[0])
+    except (IOError, OSError):
+        return None
+
+    # A zombie process has no memory fields.
+    if len(values) != len(STATUS_FIELDS):
+        return None
+    return values
+
+
+def profile_script(iotjs, script, interval, duration, timeout, memstat,
+                   growth_threshold):
+    """ Run the script and sample its memory usage until it exits or the
+        duration is over. Without a duration, the script is killed after
+        the timeout.
+    """
+    cmd = [iotjs, script]
+    if memstat:
+        cmd = [iotjs, '--memstat', script]
+
+    start = monotonic()
+    process = subprocess.Popen(cmd, cwd=path.TEST_ROOT,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT,
+                               **NEW_PROCESS_GROUP)
+
+    chunks = []
+    reader = threading.Thread(target=read_output,
+                              args=(process.stdout, chunks))
+    reader.daemon = True
+    reader.start()
+
+    samples = []
+    stopped = False
+    timed_out = False
+    while process.poll() is None:
+        elapsed = monotonic() - start
+        if duration is not None and elapsed >= duration:
+            stop_process(process, STOP_GRACE_PERIOD)
+            stopped = True
+            break
+        if duration is None and elapsed >= timeout:
+            signal_group(process, signal.SIGKILL)
+            timed_out = True
+            break
+
+        values = read_status(process.pid)
+        if values is not None:
+            samples.append(OrderedDict([('time', round(elapsed, 3))] +
+                                       list(values.items())))
+        time.sleep(interval)
+
+    process.wait()
+    reader.join(STOP_GRACE_PERIOD)
+    if reader.is_alive():
+        # Other processes of the group still hold the output open, so the
+        # group exists and its id was not reused.
+        signal_group(process, signal.SIGKILL)
+        reader.join(STOP_GRACE_PERIOD)
+    process.stdout.close()
+
+    heap_peak = None
+    match = HEAP_PEAK_PATTERN.search(b''.join(chunks).decode('utf8',
+                                                             'replace'))
+    if match:
+        heap_peak = int(match.group(1))
+
+    return OrderedDict([
+        ('script', script),
+        ('exitcode', None if stopped or timed_out else process.returncode),
+        ('timed_out', timed_out),
+        ('jerry_heap_peak_bytes', heap_peak),
+        ('growth', find_growth(samples, growth_threshold)),
+        ('samples', samples)
+    ])
+
+
+def find_growth(samples, threshold):
+    """ Return the growth in percent of each series which grows
+        monotonically, by series name.
+    """
+    growth = OrderedDict()
+    # Too few samples to tell a trend from noise.
+    if len(samples) < GROWTH_WINDOWS * 2:
+        return growth
+
+    size = len(samples) // GROWTH_WINDOWS
+    for field in STATUS_FIELDS.values():
+        series = [sample[field] for sample in samples]
+        windows = [median(series[idx * size:(idx + 1) * size])
+                   for idx in range(GROWTH_WINDOWS)]
+
+        monotonic_growth = all(windows[idx] <= windows[idx + 1]
+                               for idx in range(GROWTH_WINDOWS - 1))
+        change = relative_change(windows[0], windows[-1])
+        if monotonic_growth and change is not None and change > threshold:
+            growth[field] = round(change, 1)
+
+    return growth
+
+
+def write_csv(output_file, profiles):
+    fields = ['script', 'time'] + list(STATUS_FIELDS.values())
+    writer = csv.writer(output_file, lineterminator='\n')
+    writer.writerow(fields)
+    for profile in profiles:
+        for sample in profile['samples']:
+            writer.writerow([profile['script']] +
+                            [sample[field] for field in fields[1:]])
+
+
+def report_profile(profile):
+    """ Print the summary of a profile to the standard error, so it does not
+        mix with the time series.
+    """
+    summary = '%s: %d samples' % (profile['script'], len(profile['samples']))
+    if profile['jerry_heap_peak_bytes'] is not None:
+        summary += (', JS heap peak %d bytes at exit'
+                    % profile['jerry_heap_peak_bytes'])
+    if profile['exitcode']:
+        summary += ', exit code %d' % profile['exitcode']
+    print(summary, file=sys.stderr)
+
+    if profile['timed_out']:
+        print('%s  killed after the timeout%s'
+              % (Terminal.red, Terminal.empty), file=sys.stderr)
+
+    for field, change in profile['growth'].items():
+        print('%s  %s grows monotonically: +%.1f%%%s'
+              % (Terminal.yellow, field, change, Terminal.empty),
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    script_args = get_arguments()
+
+    if not fs.exists('/proc/self/status'):
+        print("%sThe memory profiler requires /proc%s"
+              % (Terminal.red, Terminal.empty), file=sys.stderr)
+        sys.exit(1)
+
+    iotjs = fs.abspath(script_args.iotjs)
+    scripts = [(fs.abspath(script), script_args.timeout)
+               for script in script_args.scripts]
+    if not scripts:
+        scripts = [(os.path.join(path.RUN_PASS_DIR, test['name']),
+                    test.get('timeout', script_args.timeout))
+                   for test in sorted(load_run_pass_tests(),
+                                      key=lambda test: test['name'])]
+
+    profiles = []
+    for script, timeout in scripts:
+        profile = profile_script(iotjs, script, script_args.interval,
+                                 script_args.duration, timeout,
+                                 script_args.memstat,
+                                 script_args.growth_threshold)
+        report_profile(profile)
+        profiles.append(profile)
+
+    output_file = sys.stdout
+    if script_args.output:
+        output_file = open(script_args.output, 'w')
+    try:
+        if script_args.format == 'csv':
+            write_csv(output_file, profiles)
+        else:
+            json.dump(profiles, output_file, indent=2)
+            output_file.write('\n')
+    finally:
+        if script_args.output:
+            output_file.close()
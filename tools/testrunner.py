@@ -17,22 +17,23 @@
 from __future__ import print_function
 
 import argparse
+import fnmatch
+import hashlib
 import json
-import multiprocessing
+import multiprocessing.pool
 import os
+import re
+import signal
 import subprocess
 import sys
+import threading
 import time
-
-try:
-    import queue
-except ImportError:
-    # Backwards compatibility
-    import Queue as queue
-
+import xml.etree.ElementTree as ElementTree
 
 from collections import OrderedDict
 from common_py import path
+from common_py.measure import NEW_PROCESS_GROUP, median, monotonic
+from common_py.measure import peak_rss_kb, read_output, signal_group
 from common_py.system.filesystem import FileSystem as fs
 from common_py.system.executor import Executor
 from common_py.system.executor import Terminal
@@ -42,50 +43,597 @@ from common_py.system.platform import Platform
 # The path must be consistent with the measure_coverage.sh script.
 JS_COVERAGE_FOLDER = fs.join(path.PROJECT_ROOT, '.coverage_output')
 
-# This code should be applied to each testfile.
-JS_COVERAGE_CODE = (
-"""
-process.on('exit', function() {{
-  if (typeof __coverage__ == 'undefined')
-    return;
-
-  if (typeof fs == 'undefined')
-    var fs = require('fs');
-
-  if (!fs.existsSync('{folder}'))
-    fs.mkdirSync('{folder}');
-
-  var filename = '{folder}/{file}';
-  fs.writeFileSync(filename, Buffer(JSON.stringify(__coverage__)));
-}})
-"""
-)
-
-# Append coverage source to the appropriate test.
-def append_coverage_code(testfile, coverage):
-    if not coverage:
-        return
-
-    with open(testfile, 'r') as file_p:
-        content = file_p.read()
-
-    with open(testfile, 'w') as file_p:
-        file_p.write(JS_COVERAGE_CODE.format(
-            folder=JS_COVERAGE_FOLDER, file=fs.basename(testfile)))
-        file_p.write(content)
-
-
-# Remove coverage source from the appropriate test.
-def remove_coverage_code(testfile, coverage):
-    if not coverage:
-        return
-
-    with open(testfile, 'r') as file_p:
-        content = file_p.read()
-        index = content.find('/* Copyright')
+# The coverage of all the tests of a run is appended to this file by
+# test/tools/iotjs_coverage_runner.js, one line of JSON for each test.
+JS_COVERAGE_STREAM = fs.join(JS_COVERAGE_FOLDER, 'coverage.stream')
+
+# The merged coverage of the run, the input of `nyc report`.
+JS_COVERAGE_OUTPUT = fs.join(JS_COVERAGE_FOLDER, 'coverage.json')
+
+
+def merge_coverage(merged, coverage):
+    """ Add the istanbul coverage of a test to the merged coverage. """
+    for source, source_coverage in coverage.items():
+        if source not in merged:
+            merged[source] = source_coverage
+            continue
+
+        merged_source = merged[source]
+        for key in ["s", "f"]:
+            counters = merged_source[key]
+            for idx, count in source_coverage[key].items():
+                counters[idx] = counters.get(idx, 0) + count
+        for idx, counts in source_coverage["b"].items():
+            branches = merged_source["b"].setdefault(idx, [0] * len(counts))
+            for branch, count in enumerate(counts):
+                branches[branch] += count
+
+
+def collect_coverage(stream_path, output_path):
+    """ Merge the coverage stream of a run into one coverage file. Return
+        the number of tests whose coverage was merged.
+    """
+    merged = {}
+    tests = 0
+    if fs.exists(stream_path):
+        with open(stream_path, 'r') as stream_file:
+            for line in stream_file:
+                try:
+                    coverage = json.loads(line)
+                except ValueError:
+                    # The line of a test killed while writing it.
+                    continue
+                merge_coverage(merged, coverage)
+                tests += 1
+        os.remove(stream_path)
+
+    with open(output_path, 'w') as output_file:
+        json.dump(merged, output_file)
+    return tests
+
+
+# Runtimes of the previous test runs.
+TEST_HISTORY_PATH = fs.join(path.BUILD_ROOT, 'testrunner_history.json')
+
+# Number of runtimes and results kept for each test in the history.
+TEST_HISTORY_LENGTH = 20
+
+# Tests running this many times longer than their median are reported.
+SLOWDOWN_FACTOR = 2.0
+# ... if the difference is at least this many seconds.
+SLOWDOWN_MIN_SECONDS = 1.0
+
+# The tests of these modules usually listen on fixed ports, so several
+# copies of them can not run at the same time.
+NETWORK_MODULES = ["dgram", "http", "https", "mqtt", "net", "tls"]
+
+# Digests of the tests which passed Valgrind.
+VALGRIND_CACHE_PATH = fs.join(path.BUILD_ROOT, 'testrunner_valgrind.json')
+
+VALGRIND_OPTIONS = [
+    "--leak-check=full",
+    "--error-exitcode=5",
+    "--undef-value-errors=no"
+]
+
+# A suppression generated by Valgrind for an error.
+VALGRIND_SUPPRESSION = re.compile(b"^{\n.*?^}$", re.M | re.S)
+
+# Changed files matching these patterns do not affect the tests.
+UNTESTED_FILES = ["docs/*", "*.md", "LICENSE"]
+
+
+def wait_process(process, deadline):
+    """ Wait for the process until the deadline. Return its resource usage
+        or None if it is still running.
+    """
+    while True:
+        pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            if os.WIFSIGNALED(status):
+                process.returncode = -os.WTERMSIG(status)
+            else:
+                process.returncode = os.WEXITSTATUS(status)
+            return rusage
+
+        if monotonic() >= deadline:
+            return None
+        time.sleep(0.01)
+
+
+# Resource usage of a test as stored in the results.
+RESOURCE_NAMES = [
+    "user_time",
+    "sys_time",
+    "peak_rss",
+    "major_faults",
+    "minor_faults",
+    "voluntary_switches",
+    "involuntary_switches"
+]
+
+
+def resource_usage(rusage):
+    """ Return the interesting fields of the resource usage of a test.
+        The CPU times are in seconds, the peak RSS is in kilobytes.
+    """
+    return {
+        "user_time": round(rusage.ru_utime, 3),
+        "sys_time": round(rusage.ru_stime, 3),
+        "peak_rss": peak_rss_kb(rusage),
+        "major_faults": rusage.ru_majflt,
+        "minor_faults": rusage.ru_minflt,
+        "voluntary_switches": rusage.ru_nvcsw,
+        "involuntary_switches": rusage.ru_nivcsw
+    }
+
+
+# Prefix of the marker lines in the output of a batch of tests, see
+# test/tools/iotjs_batch_runner.js.
+BATCH_MARKER = b"### IOTJS BATCH "
+
+
+def split_batch_output(output):
+    """ Split the output of a batch of tests. Return a (passed, output,
+        runtime) tuple for each test which finished, in the order they ran.
+    """
+    results = []
+    chunks = None
+    for line in output.splitlines(True):
+        if not line.startswith(BATCH_MARKER):
+            if chunks is not None:
+                chunks.append(line)
+            continue
+
+        fields = line[len(BATCH_MARKER):].split()
+        if fields[0] == b"START":
+            chunks = []
+        elif fields[0] == b"END" and chunks is not None:
+            results.append((fields[1] == b"PASS", b"".join(chunks),
+                            round(int(fields[2]) / 1000.0, 2)))
+            chunks = None
+
+    return results
+
+
+def guess_buildtype(iotjs):
+    """ The build script places the binary in <target>/<buildtype>/bin. """
+    buildtype = fs.basename(fs.dirname(fs.dirname(iotjs)))
+    if buildtype in ["debug", "release"]:
+        return buildtype
+    return "unknown"
+
+
+class TestHistory(object):
+    """ Runtimes and results of the previous test runs of a build flavor.
+        The results of a run are the statuses of its attempts.
+    """
+
+    def __init__(self, history_path, flavor):
+        self.history_path = history_path
+        self.flavor = flavor
+        self.tests = self.load(warn=True).get(flavor, {})
+        self.updated = set()
+
+    def load(self, warn=False):
+        if not self.history_path or not fs.exists(self.history_path):
+            return {}
+        try:
+            with open(self.history_path, 'r') as history_file:
+                history = json.load(history_file)
+        except (IOError, ValueError):
+            # A damaged history is simply started again.
+            return {}
+
+        if not self.is_valid(history):
+            if warn:
+                Reporter.message("Ignoring the test history %s, it is not a "
+                                 "history of test runs" % self.history_path,
+                                 Terminal.yellow)
+            return {}
+
+        # Older histories only have the runtimes of the tests.
+        for tests in history.values():
+            for test_id, entry in tests.items():
+                if isinstance(entry, list):
+                    tests[test_id] = {"runtimes": entry}
+        return history
 
-    with open(testfile, 'w') as file_p:
-        file_p.write(content[index:])
+    @staticmethod
+    def is_valid(history):
+        """ Return whether the history maps the flavors to the entries of
+            their tests.
+        """
+        if not isinstance(history, dict):
+            return False
+        for tests in history.values():
+            if not isinstance(tests, dict):
+                return False
+            for entry in tests.values():
+                if isinstance(entry, list):
+                    continue
+                if not isinstance(entry, dict):
+                    return False
+                if not all(isinstance(entry.get(key, []), list)
+                           for key in ["runtimes", "results"]):
+                    return False
+        return True
+
+    def entry(self, test_id):
+        self.updated.add(test_id)
+        return self.tests.setdefault(test_id, {})
+
+    def expected_runtime(self, test_id):
+        runtimes = self.tests.get(test_id, {}).get("runtimes")
+        if not runtimes:
+            return None
+        return median(runtimes)
+
+    def add(self, test_id, runtime):
+        runtimes = self.entry(test_id).setdefault("runtimes", [])
+        runtimes.append(runtime)
+        del runtimes[:-TEST_HISTORY_LENGTH]
+
+    def add_attempts(self, test_id, attempts):
+        results = self.entry(test_id).setdefault("results", [])
+        results.append(attempts)
+        del results[:-TEST_HISTORY_LENGTH]
+
+    def stability(self, test_id):
+        """ Classify the test by the attempts of its previous runs: `stable`
+            if they all passed, `broken` if none of them passed and `flaky`
+            otherwise. Return None for a test without results.
+        """
+        results = self.tests.get(test_id, {}).get("results")
+        if not results:
+            return None
+
+        attempts = [status for run in results for status in run]
+        if all(status == "pass" for status in attempts):
+            return "stable"
+        if "pass" not in attempts:
+            return "broken"
+        return "flaky"
+
+    def save(self):
+        if not self.history_path:
+            return
+
+        # Other runs (e.g. other shards) may have updated the history
+        # meanwhile, so only the tests of this run are replaced.
+        history = self.load()
+        tests = history.setdefault(self.flavor, {})
+        for test_id in self.updated:
+            tests[test_id] = self.tests[test_id]
+
+        fs.maybe_make_directory(fs.dirname(self.history_path))
+        with fs.atomic_write(self.history_path) as history_file:
+            json.dump(history, history_file, indent=2, sort_keys=True)
+
+
+def file_digest(file_path):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as file_p:
+        for block in iter(lambda: file_p.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ValgrindCache(object):
+    """ The tests which passed Valgrind, so they do not need to run under
+        Valgrind again while neither the binary, nor the test file, nor the
+        suppressions change.
+    """
+
+    def __init__(self, cache_path, iotjs, suppressions_path):
+        self.cache_path = cache_path
+        self.passed = self.load()
+        self.updated = set()
+
+        digest = hashlib.sha1()
+        digest.update(" ".join(VALGRIND_OPTIONS).encode("utf8"))
+        digest.update(file_digest(iotjs).encode("utf8"))
+        if suppressions_path and fs.exists(suppressions_path):
+            digest.update(file_digest(suppressions_path).encode("utf8"))
+        self.run_digest = digest.hexdigest()
+
+    def load(self):
+        if not self.cache_path or not fs.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r') as cache_file:
+                return json.load(cache_file)
+        except (IOError, ValueError):
+            return {}
+
+    def test_digest(self, testfile):
+        digest = hashlib.sha1(self.run_digest.encode("utf8"))
+        digest.update(file_digest(testfile).encode("utf8"))
+        return digest.hexdigest()
+
+    def has_passed(self, test_id, test_digest):
+        return self.passed.get(test_id) == test_digest
+
+    def add(self, test_id, test_digest):
+        self.passed[test_id] = test_digest
+        self.updated.add(test_id)
+
+    def save(self):
+        if not self.cache_path or not self.updated:
+            return
+
+        cache = self.load()
+        for test_id in self.updated:
+            cache[test_id] = self.passed[test_id]
+
+        fs.maybe_make_directory(fs.dirname(self.cache_path))
+        with fs.atomic_write(self.cache_path) as cache_file:
+            json.dump(cache, cache_file, indent=2, sort_keys=True)
+
+
+def save_suppressions(suppressions_path, suppressions):
+    """ Append the new suppressions to the suppressions file. Return the
+        number of suppressions added.
+    """
+    known = set()
+    if fs.exists(suppressions_path):
+        with open(suppressions_path, 'rb') as suppressions_file:
+            content = suppressions_file.read()
+        known.update(VALGRIND_SUPPRESSION.findall(content))
+
+    added = [suppression for suppression in sorted(suppressions)
+             if suppression not in known]
+    if added:
+        fs.maybe_make_directory(fs.dirname(fs.abspath(suppressions_path)))
+        with open(suppressions_path, 'ab') as suppressions_file:
+            for suppression in added:
+                suppressions_file.write(suppression + b"\n")
+    return len(added)
+
+
+def load_testsets():
+    with open(fs.join(path.TEST_ROOT, "testsets.json")) as testsets_file:
+        return json.load(testsets_file, object_pairs_hook=OrderedDict)
+
+
+def write_json_results(output_path, configuration, summary, records):
+    results = OrderedDict([
+        ("configuration", configuration),
+        ("summary", summary),
+        ("tests", records)
+    ])
+
+    with open(output_path, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+
+
+def merge_json_results(input_paths):
+    """ Merge the JSON results of the shards of a test run. Return the
+        configuration, the summary and the test records of the whole run.
+    """
+    configurations = []
+    summary = OrderedDict()
+    records = []
+
+    for input_path in input_paths:
+        with open(input_path) as input_file:
+            results = json.load(input_file, object_pairs_hook=OrderedDict)
+
+        configurations.append(results["configuration"])
+        for key, value in results["summary"].items():
+            summary[key] = summary.get(key, 0) + value
+        records.extend(results["tests"])
+
+    # The shards must agree on the distribution of the tests, which they
+    # do not if they used different histories.
+    digests = set(shard_configuration.get("shard_digest")
+                  for shard_configuration in configurations)
+    if len(digests) > 1:
+        Executor.fail("The shards distributed the tests by different "
+                      "weights, use the same history for every shard")
+
+    shards = sorted(tuple(shard_configuration.get("shard", [0, 1]))
+                    for shard_configuration in configurations)
+    shard_count = len(input_paths)
+    if shards != [(index, shard_count) for index in range(shard_count)]:
+        Executor.fail("The results are not the shards of one run: %s" %
+                      ", ".join("%d/%d" % shard for shard in shards))
+
+    configuration = configurations[0]
+    configuration.pop("shard", None)
+    configuration["shards"] = shard_count
+
+    test_ids = ["%s/%s" % (record["testset"], record["name"])
+                for record in records]
+    duplicates = sorted(set(test_id for test_id in test_ids
+                            if test_ids.count(test_id) > 1))
+    if duplicates:
+        Executor.fail("Tests run by more than one shard: %s" %
+                      ", ".join(duplicates))
+
+    # Keep the order of testsets.json.
+    order = {}
+    for testset, tests in load_testsets().items():
+        for test in tests:
+            order[(testset, test["name"])] = len(order)
+
+    # Without --changed-since every test of testsets.json belongs to one
+    # of the shards.
+    if not configuration.get("changed_since"):
+        missing = sorted(set(order) - set((record["testset"], record["name"])
+                                          for record in records))
+        if missing:
+            Executor.fail("Tests run by none of the shards: %s" %
+                          ", ".join("%s/%s" % test_id for test_id in missing))
+    records.sort(key=lambda record: order.get((record["testset"],
+                                               record["name"]), len(order)))
+
+    return configuration, summary, records
+
+
+def get_changed_files(base):
+    """ Return the files changed since the given git revision, including
+        the uncommitted changes, relative to the project root.
+    """
+    output = Executor.check_run_cmd_output("git", ["-C", path.PROJECT_ROOT,
+                                                   "diff", "--name-only",
+                                                   base, "--"], quiet=True)
+    if not isinstance(output, str):
+        output = output.decode("utf8")
+    return [line for line in output.splitlines() if line]
+
+
+def load_module_graph():
+    """ Return the source files of each module and the modules which
+        require each module, based on src/modules.json.
+    """
+    with open(fs.join(path.SRC_ROOT, "modules.json")) as modules_file:
+        modules = json.load(modules_file)["modules"]
+
+    module_files = {}
+    dependents = {}
+    for name, module in modules.items():
+        descriptions = [module] + list(module.get("platforms", {}).values())
+
+        files = set()
+        for description in descriptions:
+            files.update(description.get("native_files", []))
+            for required in description.get("require", []):
+                dependents.setdefault(required, set()).add(name)
+        if "js_file" in module:
+            files.add(module["js_file"])
+        if "cmakefile" in module:
+            files.add(module["cmakefile"])
+
+        module_files[name] = set(fs.normpath(fs.join("src", module_file))
+                                 for module_file in files)
+
+    return module_files, dependents
+
+
+def get_changed_modules(changed_files, test_files):
+    """ Map the changed files to the affected modules, including the
+        modules requiring them. Changed test files are not mapped, they
+        are selected by name. Return None if a file can not be mapped
+        to modules, so all the tests must run.
+    """
+    module_files, dependents = load_module_graph()
+
+    owners = {}
+    for name, files in module_files.items():
+        for module_file in files:
+            owners.setdefault(module_file, set()).add(name)
+            # The header of a native file belongs to the same module.
+            header = os.path.splitext(module_file)[0] + ".h"
+            owners.setdefault(header, set()).add(name)
+
+    changed = set()
+    for changed_file in changed_files:
+        if any(fnmatch.fnmatch(changed_file, pattern)
+               for pattern in UNTESTED_FILES):
+            continue
+        if changed_file in test_files:
+            continue
+        if changed_file not in owners:
+            return None
+        changed.update(owners[changed_file])
+
+    # Add every module which requires a changed module.
+    pending = list(changed)
+    while pending:
+        for dependent in dependents.get(pending.pop(), []):
+            if dependent not in changed:
+                changed.add(dependent)
+                pending.append(dependent)
+
+    return changed
+
+
+def get_tested_modules(test_name):
+    """ Return the possible module names of a test from its file name,
+        `test_<module name>[_<functionality>].js` (or dashes).
+    """
+    name = re.split("[._]", test_name.replace("-", "_"))
+    return set("_".join(name[1:end]) for end in range(2, len(name)))
+
+
+def shard_tests(test_ids, weights, shard_count):
+    """ Distribute the tests among the shards so that the total weight of
+        the shards is about the same. Return the shard index of each test.
+
+        The result only depends on the arguments, so every shard of a run
+        computes the same distribution as long as they use the same
+        weights.
+    """
+    loads = [0] * shard_count
+    shards = {}
+
+    # The heaviest tests are placed first, always on the lightest shard.
+    for test_id in sorted(test_ids, key=lambda test_id: (-weights[test_id],
+                                                         test_id)):
+        shard = min(range(shard_count), key=lambda idx: (loads[idx], idx))
+        shards[test_id] = shard
+        loads[shard] += weights[test_id]
+
+    return shards
+
+
+# Characters which are not allowed in XML 1.0 documents.
+INVALID_XML_CHARS = re.compile(u"[^\u0009\u000a\u000d\u0020-\ud7ff"
+                               u"\ue000-\ufffd]")
+
+
+def write_junit_results(output_path, records):
+    testsuites = ElementTree.Element("testsuites")
+
+    testsets = OrderedDict()
+    for record in records:
+        testsets.setdefault(record["testset"], []).append(record)
+
+    for testset, testset_records in testsets.items():
+        statuses = [record["status"] for record in testset_records]
+        testsuite = ElementTree.SubElement(testsuites, "testsuite")
+        testsuite.set("name", testset)
+        testsuite.set("tests", str(len(testset_records)))
+        testsuite.set("failures", str(statuses.count("fail")))
+        testsuite.set("errors", str(statuses.count("timeout")))
+        testsuite.set("skipped", str(statuses.count("skip")))
+        testsuite.set("time", str(round(sum(record["runtime"] or 0
+                                            for record in testset_records),
+                                        2)))
+
+        for record in testset_records:
+            testcase = ElementTree.SubElement(testsuite, "testcase")
+            testcase.set("classname", testset)
+            testcase.set("name", record["name"])
+            testcase.set("time", str(record["runtime"] or 0))
+
+            if record["status"] == "skip":
+                skipped = ElementTree.SubElement(testcase, "skipped")
+                skipped.set("message", record["reason"] or "")
+            elif record["status"] == "fail":
+                failure = ElementTree.SubElement(testcase, "failure")
+                if record["exceeded"]:
+                    failure.set("message", "; ".join(record["exceeded"]))
+                else:
+                    failure.set("message",
+                                "exit code %d" % record["exitcode"])
+            elif record["status"] == "timeout":
+                error = ElementTree.SubElement(testcase, "error")
+                error.set("message", "timeout")
+
+            if record["peak_rss"] is not None:
+                properties = ElementTree.SubElement(testcase, "properties")
+                for name in RESOURCE_NAMES:
+                    resource = ElementTree.SubElement(properties, "property")
+                    resource.set("name", name)
+                    resource.set("value", str(record[name]))
+
+            if record["output"]:
+                system_out = ElementTree.SubElement(testcase, "system-out")
+                system_out.text = INVALID_XML_CHARS.sub("", record["output"])
+
+    ElementTree.ElementTree(testsuites).write(output_path, encoding="utf-8")
 
 
 class Reporter(object):
@@ -106,6 +654,10 @@ class Reporter(object):
     def report_fail(test, time):
         Reporter.message("  FAIL: %s (%ss)" % (test, time), Terminal.red)
 
+    @staticmethod
+    def report_limit(limit):
+        Reporter.message("    Limit exceeded: %s" % limit, Terminal.red)
+
     @staticmethod
     def report_timeout(test):
         Reporter.message("  TIMEOUT: %s" % test, Terminal.red)
@@ -126,8 +678,56 @@ class Reporter(object):
         Reporter.message("  iotjs:        %s" % testrunner.iotjs)
         Reporter.message("  quiet:        %s" % testrunner.quiet)
         Reporter.message("  timeout:      %d sec" % testrunner.timeout)
+        Reporter.message("  jobs:         %d" % testrunner.jobs)
         Reporter.message("  valgrind:     %s" % testrunner.valgrind)
+        if testrunner.valgrind_cache:
+            Reporter.message("  valgrind cache: %s" %
+                             testrunner.valgrind_cache.cache_path)
         Reporter.message("  skip-modules: %s" % testrunner.skip_modules)
+        Reporter.message("  history:      %s (%s)" %
+                         (testrunner.history.history_path or "disabled",
+                          testrunner.history.flavor))
+        if testrunner.retries:
+            Reporter.message("  retries:      %d" % testrunner.retries)
+        if testrunner.batch_size:
+            Reporter.message("  batch size:   %d" % testrunner.batch_size)
+        if testrunner.changed_since:
+            Reporter.message("  changed since: %s" % testrunner.changed_since)
+        if testrunner.shard_count > 1:
+            Reporter.message("  shard:        %d of %d" %
+                             (testrunner.shard_index + 1,
+                              testrunner.shard_count))
+
+    @staticmethod
+    def report_slower(slower):
+        Reporter.message()
+        Reporter.message("Slower than in the previous runs:", Terminal.yellow)
+        for test_id, runtime, expected in slower:
+            Reporter.message("  %s: %ss (median: %ss)" %
+                             (test_id, runtime, expected), Terminal.yellow)
+
+    @staticmethod
+    def report_unstable(unstable):
+        Reporter.message()
+        Reporter.message("Unstable tests:", Terminal.yellow)
+        for test_id, stability, attempts in unstable:
+            Reporter.message("  %s: %s (attempts in this run: %s)" %
+                             (test_id, stability, ", ".join(attempts)),
+                             Terminal.yellow)
+
+    @staticmethod
+    def report_stress(test_id, runs, statuses, runtimes):
+        Reporter.message()
+        Reporter.message("Stress test of %s:" % test_id, Terminal.blue)
+        Reporter.message("  runs:     %d" % runs)
+        for status in ["pass", "fail", "timeout"]:
+            color = Terminal.green if status == "pass" else Terminal.red
+            Reporter.message("  %-8s  %d" % (status + ":",
+                                              statuses.count(status)), color)
+        if runtimes:
+            runtimes = sorted(runtimes)
+            Reporter.message("  runtime:  min %ss, median %ss, max %ss" %
+                             (runtimes[0], median(runtimes), runtimes[-1]))
 
     @staticmethod
     def report_final(results):
@@ -141,15 +741,44 @@ class Reporter(object):
 
 class TestRunner(object):
     def __init__(self, options):
-        self._process_pool = multiprocessing.Pool(processes=1)
         self.iotjs = fs.abspath(options.iotjs)
         self.quiet = options.quiet
         self.timeout = options.timeout
         self.valgrind = options.valgrind
         self.coverage = options.coverage
+        self.jobs = max(options.jobs, 1)
         self.skip_modules = []
         self.results = {}
-        self._msg_queue = multiprocessing.Queue(1)
+        self.records = []
+        self.slower = []
+        self.unstable = []
+        self.retries = options.retries
+        self.output_json = options.output_json
+        self.output_junit = options.output_junit
+        self.shard_index = options.shard_index
+        self.shard_count = options.shard_count
+        self.shard_digest = None
+        self.changed_since = options.changed_since
+        self.suppressions_path = options.valgrind_suppressions
+        self.gen_suppressions = options.valgrind_gen_suppressions
+        self.suppressions = set()
+        self.suppressions_lock = threading.Lock()
+        # The coverage runner takes one test, so it needs single runs.
+        self.batch_size = 0
+        if options.batch and not self.coverage:
+            self.batch_size = options.batch_size
+
+        # The runtimes depend on the build type and on valgrind.
+        flavor = options.buildtype or guess_buildtype(self.iotjs)
+        if self.valgrind:
+            flavor += "-valgrind"
+        self.history = TestHistory(options.history, flavor)
+
+        self.valgrind_cache = None
+        if self.valgrind and options.valgrind_cache:
+            self.valgrind_cache = ValgrindCache(options.valgrind_cache,
+                                                self.iotjs,
+                                                self.suppressions_path)
 
         if options.skip_modules:
             self.skip_modules = options.skip_modules.split(",")
@@ -174,96 +803,543 @@ class TestRunner(object):
             "timeout": 0
         }
 
-        with open(fs.join(path.TEST_ROOT, "testsets.json")) as testsets_file:
-            testsets = json.load(testsets_file, object_pairs_hook=OrderedDict)
+        testsets = load_testsets()
+        if self.changed_since:
+            testsets = self.select_changed(testsets)
+        if self.shard_count > 1:
+            testsets = self.select_shard(testsets)
 
-        for testset, tests in testsets.items():
-            self.run_testset(testset, tests)
+        if self.coverage:
+            fs.maybe_make_directory(JS_COVERAGE_FOLDER)
+            if fs.exists(JS_COVERAGE_STREAM):
+                os.remove(JS_COVERAGE_STREAM)
+
+        # The tests are waiting for their own processes, so threads are
+        # enough to run them concurrently.
+        pool = None
+        if self.jobs > 1:
+            pool = multiprocessing.pool.ThreadPool(processes=self.jobs)
 
+        try:
+            for testset, tests in testsets.items():
+                self.run_testset(testset, tests, pool)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+            self.history.save()
+            if self.valgrind_cache:
+                self.valgrind_cache.save()
+
+        if self.coverage:
+            tests = collect_coverage(JS_COVERAGE_STREAM, JS_COVERAGE_OUTPUT)
+            Reporter.message()
+            Reporter.message("Coverage of %d tests written to %s" %
+                             (tests, JS_COVERAGE_OUTPUT))
+
+        if self.gen_suppressions and self.suppressions:
+            added = save_suppressions(self.suppressions_path,
+                                      self.suppressions)
+            Reporter.message()
+            Reporter.message("%d new suppressions written to %s" %
+                             (added, self.suppressions_path), Terminal.yellow)
+
+        if self.output_json:
+            write_json_results(self.output_json, self.configuration(),
+                               self.results, self.records)
+        if self.output_junit:
+            write_junit_results(self.output_junit, self.records)
+
+        if self.slower:
+            Reporter.report_slower(self.slower)
+        if self.unstable:
+            Reporter.report_unstable(self.unstable)
         Reporter.report_final(self.results)
 
-    def run_testset(self, testset, tests):
+    def configuration(self):
+        configuration = OrderedDict([
+            ("iotjs", self.iotjs),
+            ("valgrind", self.valgrind),
+            ("flavor", self.history.flavor),
+            ("jobs", self.jobs),
+            ("retries", self.retries),
+            ("batch_size", self.batch_size)
+        ])
+        if self.changed_since:
+            configuration["changed_since"] = self.changed_since
+        if self.shard_count > 1:
+            configuration["shard"] = [self.shard_index, self.shard_count]
+            configuration["shard_digest"] = self.shard_digest
+        return configuration
+
+    def select_changed(self, testsets):
+        """ Return the tests affected by the files changed since the
+            base revision, or all of them if that can not be decided.
+        """
+        test_files = set("test/%s/%s" % (testset, test["name"])
+                         for testset, tests in testsets.items()
+                         for test in tests)
+        changed_files = get_changed_files(self.changed_since)
+        changed_modules = get_changed_modules(changed_files, test_files)
+        if changed_modules is None:
+            Reporter.message("Running all tests, some changes can not be "
+                             "mapped to modules", Terminal.yellow)
+            return testsets
+
+        selected = OrderedDict()
+        for testset, tests in testsets.items():
+            selected_tests = []
+            for test in tests:
+                test_path = "test/%s/%s" % (testset, test["name"])
+                modules = set(test.get("required-modules", []))
+                modules |= get_tested_modules(test["name"])
+                if test_path in changed_files or modules & changed_modules:
+                    selected_tests.append(test)
+            if selected_tests:
+                selected[testset] = selected_tests
+
+        Reporter.message("Changed modules: %s" %
+                         (", ".join(sorted(changed_modules)) or "none"))
+        return selected
+
+    def select_shard(self, testsets):
+        """ Return the tests of the current shard from the testsets. """
+        test_ids = []
+        weights = {}
+
+        expected = {}
+        for testset, tests in testsets.items():
+            for test in tests:
+                test_id = "%s/%s" % (testset, test["name"])
+                test_ids.append(test_id)
+                expected[test_id] = self.history.expected_runtime(test_id)
+
+        # Tests without history weigh as much as a typical test,
+        # skipped tests weigh nothing.
+        known = [runtime for runtime in expected.values()
+                 if runtime is not None]
+        default_weight = median(known) if known else 1
+
+        for testset, tests in testsets.items():
+            for test in tests:
+                test_id = "%s/%s" % (testset, test["name"])
+                if self.skip_test(test):
+                    weights[test_id] = 0
+                elif expected[test_id] is None:
+                    weights[test_id] = default_weight
+                else:
+                    weights[test_id] = expected[test_id]
+
+        # The digest of the weights tells whether the shards of a run
+        # distributed the tests the same way.
+        self.shard_digest = hashlib.sha1(json.dumps(
+            sorted(weights.items())).encode("utf-8")).hexdigest()
+
+        shards = shard_tests(test_ids, weights, self.shard_count)
+
+        selected = OrderedDict()
+        for testset, tests in testsets.items():
+            tests = [test for test in tests
+                     if shards["%s/%s" % (testset, test["name"])] ==
+                        self.shard_index]
+            if tests:
+                selected[testset] = tests
+        return selected
+
+    def run_testset(self, testset, tests, pool=None):
         Reporter.report_testset(testset)
 
-        for test in tests:
-            testfile = fs.join(path.TEST_ROOT, testset, test["name"])
-            timeout = test.get("timeout", self.timeout)
+        test_ids = ["%s/%s" % (testset, test["name"]) for test in tests]
 
+        jobs = []
+        digests = []
+        for test_id, test in zip(test_ids, tests):
+            digests.append(None)
             if self.skip_test(test):
-                Reporter.report_skip(test["name"], test.get("reason"))
-                self.results["skip"] += 1
+                jobs.append(None)
                 continue
 
-            append_coverage_code(testfile, self.coverage)
-
-            exitcode, output, runtime = self.run_test(testfile, timeout)
-            expected_failure = test.get("expected-failure", False)
-
-            remove_coverage_code(testfile, self.coverage)
+            testfile = fs.join(path.TEST_ROOT, testset, test["name"])
+            if self.valgrind_cache:
+                digests[-1] = self.valgrind_cache.test_digest(testfile)
+                if self.valgrind_cache.has_passed(test_id, digests[-1]):
+                    test["reason"] = ("passed Valgrind with the same binary "
+                                      "and test file")
+                    jobs.append(None)
+                    continue
 
-            # Timeout happened.
-            if exitcode == -1:
-                Reporter.report_timeout(test["name"])
-                self.results["timeout"] += 1
+            timeout = test.get("timeout", self.timeout)
+            jobs.append((testfile, timeout))
+
+        expected = [self.history.expected_runtime(test_id)
+                    for test_id in test_ids]
+        batched = self.execute_batches(tests, jobs, pool)
+        results = self.execute_tests(tests, jobs, pool, expected, batched)
+        if pool is not None and self.retries:
+            # The retries below run when every test of the testset has
+            # finished, so a retried test never runs along the others.
+            results = list(results)
+
+        for idx, (test, result) in enumerate(zip(tests, results)):
+            record = {
+                "testset": testset,
+                "name": test["name"],
+                "status": None,
+                "exitcode": None,
+                "runtime": None,
+                "reason": None,
+                "exceeded": [],
+                "attempts": [],
+                "stability": None,
+                "batched": False,
+                "output": None
+            }
+            record.update(dict.fromkeys(RESOURCE_NAMES))
+            self.records.append(record)
+
+            if result is None:
+                Reporter.report_skip(test["name"], test.get("reason"))
+                self.results["skip"] += 1
+                record["status"] = "skip"
+                record["reason"] = test.get("reason")
                 continue
 
-            # Show the output.
-            if not self.quiet and output:
-                print(output.decode("utf8"), end="")
-
-            is_normal_run = (not expected_failure and exitcode == 0)
-            is_expected_fail = (expected_failure and exitcode <= 2)
-            if is_normal_run or is_expected_fail:
-                Reporter.report_pass(test["name"], runtime)
-                self.results["pass"] += 1
-            else:
-                Reporter.report_fail(test["name"], runtime)
-                self.results["fail"] += 1
-
-    @staticmethod
-    def run_subprocess(parent_queue, command):
-        process = subprocess.Popen(args=command,
-                                   cwd=path.TEST_ROOT,
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.STDOUT)
-
-        stdout = process.communicate()[0]
-        exitcode = process.returncode
+            # A failed test runs again, until it passes or runs out of
+            # retries. Only the last attempt is reported.
+            while True:
+                record["exceeded"] = self.check_limits(test, result)
+                status = self.test_status(test, result, record["exceeded"])
+                record["attempts"].append(status)
+                if status == "pass" or len(record["attempts"]) > self.retries:
+                    break
+                result = self.run_test(*jobs[idx])
+
+            record["status"] = self.report_test(test, result,
+                                                record["exceeded"])
+            record["exitcode"] = result["exitcode"]
+            record["runtime"] = result["runtime"]
+            if result["resources"]:
+                record.update(result["resources"])
+            record["output"] = result["output"].decode("utf8", "replace")
+            record["batched"] = idx in batched
+
+            if self.valgrind_cache and record["status"] == "pass":
+                self.valgrind_cache.add(test_ids[idx], digests[idx])
+
+            self.history.add_attempts(test_ids[idx], record["attempts"])
+            record["stability"] = self.history.stability(test_ids[idx])
+            if record["stability"] not in [None, "stable"]:
+                self.unstable.append((test_ids[idx], record["stability"],
+                                      record["attempts"]))
+
+            # A test in a batch does not pay for starting iotjs, so its
+            # runtime is not comparable with the history.
+            if record["batched"]:
+                continue
 
-        parent_queue.put_nowait([exitcode, stdout])
+            runtime = result["runtime"]
+            if record["status"] == "timeout":
+                runtime = jobs[idx][1]
+            elif (expected[idx] is not None and
+                  runtime >= expected[idx] * SLOWDOWN_FACTOR and
+                  runtime - expected[idx] >= SLOWDOWN_MIN_SECONDS):
+                self.slower.append((test_ids[idx], runtime, expected[idx]))
+            self.history.add(test_ids[idx], runtime)
+
+    def can_batch(self, test):
+        """ Return whether the test may run in a batch with other tests. """
+        if not test.get("batch", False) or test.get("serial", False):
+            return False
+        # These need the exit code and the resource usage of a whole process.
+        for attribute in ["expected-failure", "max-rss", "max-cpu-time"]:
+            if test.get(attribute):
+                return False
+        return True
+
+    def execute_batches(self, tests, jobs, pool=None):
+        """ Run the tests which can be batched in groups, each group in one
+            iotjs process. Return the results of the tests which passed by
+            their index.
+
+            The tests which failed in a batch, or whose batch crashed or
+            timed out, are left out, so they run again on their own and
+            their result comes from an isolated run.
+        """
+        if not self.batch_size:
+            return {}
+
+        indices = [idx for idx, (test, job) in enumerate(zip(tests, jobs))
+                   if job and self.can_batch(test)]
+        batches = [indices[start:start + self.batch_size]
+                   for start in range(0, len(indices), self.batch_size)]
+
+        def run(batch):
+            return self.run_batch([jobs[idx] for idx in batch])
+
+        if pool is None:
+            outputs = [run(batch) for batch in batches]
+        else:
+            outputs = pool.map(run, batches)
+
+        batched = {}
+        for batch, results in zip(batches, outputs):
+            for idx, (passed, output, runtime) in zip(batch, results):
+                if passed:
+                    batched[idx] = {
+                        "exitcode": 0,
+                        "output": output,
+                        "runtime": runtime,
+                        "resources": None
+                    }
+        return batched
+
+    def run_batch(self, jobs):
+        """ Run the test files of the jobs in one iotjs process. Return the
+            results of the tests which finished, or an empty list if the
+            process did not exit normally.
+        """
+        testfiles = [testfile for testfile, timeout in jobs]
+        # The tests of a batch are quick, the longest single timeout is
+        # enough for all of them.
+        timeout = max(timeout for testfile, timeout in jobs)
+
+        result = self.run_command([path.BATCH_RUNNER_PATH] + testfiles,
+                                  timeout)
+        if result["exitcode"] != 0:
+            return []
+        return split_batch_output(result["output"])
+
+    def execute_tests(self, tests, jobs, pool=None, expected=None,
+                      batched={}):
+        """ Yield the results of the jobs in the order of the tests.
+
+            The results of the tests which already passed in a batch are
+            taken from `batched`, those tests do not run again.
+
+            Without a pool the jobs run one by one. Otherwise the tests
+            marked as serial run alone first, then the others run in the
+            pool and their results are yielded as soon as all the previous
+            ones are available. The pool starts the tests which took the
+            longest in the previous runs (according to `expected`) first,
+            the tests without history before all of them.
+        """
+        if pool is None:
+            for idx, job in enumerate(jobs):
+                if idx in batched:
+                    yield batched[idx]
+                else:
+                    yield job and self.run_test(*job)
+            return
+
+        results = [batched.get(idx) for idx in range(len(jobs))]
+        for idx, (test, job) in enumerate(zip(tests, jobs)):
+            if job and results[idx] is None and test.get("serial", False):
+                results[idx] = self.run_test(*job)
+
+        order = list(range(len(jobs)))
+        if expected:
+            order.sort(key=lambda idx: (expected[idx] is not None,
+                                        -(expected[idx] or 0)))
+
+        pending = [None] * len(jobs)
+        for idx in order:
+            if jobs[idx] and results[idx] is None:
+                pending[idx] = pool.apply_async(self.run_test, jobs[idx])
+
+        for idx, result in enumerate(results):
+            if pending[idx] is not None:
+                result = pending[idx].get()
+            yield result
+
+    def check_limits(self, test, result):
+        """ Return the descriptions of the resource limits of the test
+            (set in testsets.json) which were exceeded.
+        """
+        resources = result["resources"]
+        # Valgrind changes both the memory and the CPU usage.
+        if not resources or self.valgrind:
+            return []
+
+        exceeded = []
+        max_rss = test.get("max-rss")
+        if max_rss is not None and resources["peak_rss"] > max_rss:
+            exceeded.append("peak RSS %d KB > %d KB"
+                            % (resources["peak_rss"], max_rss))
+
+        max_cpu_time = test.get("max-cpu-time")
+        cpu_time = resources["user_time"] + resources["sys_time"]
+        if max_cpu_time is not None and cpu_time > max_cpu_time:
+            exceeded.append("CPU time %.2fs > %ss" % (cpu_time, max_cpu_time))
+
+        return exceeded
+
+    def test_status(self, test, result, exceeded=[]):
+        """ Return the status of a test from its result. """
+        expected_failure = test.get("expected-failure", False)
+        exitcode = result["exitcode"]
+
+        if exitcode == -1:
+            return "timeout"
+
+        is_normal_run = (not expected_failure and exitcode == 0)
+        is_expected_fail = (expected_failure and exitcode <= 2)
+        if (is_normal_run or is_expected_fail) and not exceeded:
+            return "pass"
+        return "fail"
+
+    def report_test(self, test, result, exceeded=[]):
+        """ Report the result of a test and return its status. """
+        status = self.test_status(test, result, exceeded)
+        runtime = result["runtime"]
+
+        # Timeout happened.
+        if status == "timeout":
+            Reporter.report_timeout(test["name"])
+            self.results["timeout"] += 1
+            return "timeout"
+
+        # Show the output.
+        if not self.quiet and result["output"]:
+            print(result["output"].decode("utf8"), end="")
+
+        if status == "pass":
+            Reporter.report_pass(test["name"], runtime)
+            self.results["pass"] += 1
+            return "pass"
+
+        Reporter.report_fail(test["name"], runtime)
+        for limit in exceeded:
+            Reporter.report_limit(limit)
+        self.results["fail"] += 1
+        return "fail"
 
     def run_test(self, testfile, timeout):
-        command = [self.iotjs, testfile]
+        if self.coverage:
+            return self.run_command([path.COVERAGE_RUNNER_PATH,
+                                     JS_COVERAGE_STREAM, testfile], timeout)
+        return self.run_command([testfile], timeout)
+
+    def run_command(self, arguments, timeout):
+        """ Run iotjs with the arguments and return its exit code, output,
+            runtime and resource usage.
+        """
+        command = [self.iotjs] + arguments
 
         if self.valgrind:
-            valgrind_options = [
-                "--leak-check=full",
-                "--error-exitcode=5",
-                "--undef-value-errors=no"
-            ]
+            valgrind_options = list(VALGRIND_OPTIONS)
+            if self.suppressions_path and fs.exists(self.suppressions_path):
+                valgrind_options.append("--suppressions=%s" %
+                                        self.suppressions_path)
+            if self.gen_suppressions:
+                valgrind_options.append("--gen-suppressions=all")
 
             command = ["valgrind"] + valgrind_options + command
 
-        try:
-            process = multiprocessing.Process(target=TestRunner.run_subprocess,
-                                              args=(self._msg_queue, command,))
-            start = time.time()
-            process.start()
-            process.join(timeout)
-            runtime = round((time.time() - start), 2)
-
-            if process.is_alive():
-                raise multiprocessing.TimeoutError("Test still running")
-
-            # At this point the queue must have data!
-            # If not then it is also a timeout event
-            exitcode, stdout = self._msg_queue.get_nowait()
-
-        except (multiprocessing.TimeoutError, queue.Full):
-            process.terminate()
-            return -1, None, None
+        start = monotonic()
+        deadline = start + timeout
+        process = subprocess.Popen(args=command,
+                                   cwd=path.TEST_ROOT,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT,
+                                   **NEW_PROCESS_GROUP)
+
+        # The output is collected while the test runs, so a test writing
+        # more than the pipe buffer never blocks.
+        chunks = []
+        reader = threading.Thread(target=read_output,
+                                  args=(process.stdout, chunks))
+        reader.daemon = True
+        reader.start()
+        reader.join(timeout)
+
+        rusage = wait_process(process, deadline)
+        runtime = round(monotonic() - start, 2)
+
+        if reader.is_alive() or rusage is None:
+            signal_group(process, signal.SIGKILL)
+            process.wait()
+            reader.join()
+            process.stdout.close()
+            return {
+                "exitcode": -1,
+                "output": b"".join(chunks),
+                "runtime": None,
+                "resources": None
+            }
+
+        process.stdout.close()
+
+        if self.gen_suppressions:
+            suppressions = VALGRIND_SUPPRESSION.findall(b"".join(chunks))
+            with self.suppressions_lock:
+                self.suppressions.update(suppressions)
+
+        return {
+            "exitcode": process.returncode,
+            "output": b"".join(chunks),
+            "runtime": runtime,
+            "resources": resource_usage(rusage)
+        }
 
-        return exitcode, stdout, runtime
+    def find_test(self, test_id):
+        """ Return the testset and the description of a test given as
+            `testset/name` or as the name of the test file.
+        """
+        for testset, tests in load_testsets().items():
+            for test in tests:
+                if test_id in ["%s/%s" % (testset, test["name"]),
+                               test["name"]]:
+                    return testset, test
+        return None, None
+
+    def stress(self, test_id, runs):
+        """ Run a test many times in parallel to reproduce failures which
+            depend on the timing. The test runs even if it is skipped in
+            testsets.json. Return the number of failed runs.
+
+            The serial tests and the tests of the network modules run one
+            after the other, their copies would collide on the same files
+            or ports.
+        """
+        testset, test = self.find_test(test_id)
+        if test is None:
+            Reporter.message("Unknown test: %s" % test_id, Terminal.red)
+            return runs
+
+        test_id = "%s/%s" % (testset, test["name"])
+        testfile = fs.join(path.TEST_ROOT, testset, test["name"])
+        job = (testfile, test.get("timeout", self.timeout))
+
+        uses_network = set(NETWORK_MODULES).intersection(
+            test.get("required-modules", []))
+        if self.jobs > 1 and (test.get("serial", False) or uses_network):
+            Reporter.message("The runs of %s do not run in parallel, it is "
+                             "serial or it may listen on a fixed port"
+                             % test_id, Terminal.yellow)
+            results = [self.run_test(*job) for run in range(runs)]
+        else:
+            pool = multiprocessing.pool.ThreadPool(processes=self.jobs)
+            try:
+                results = pool.map(lambda run: self.run_test(*job),
+                                   range(runs))
+            finally:
+                pool.close()
+                pool.join()
+
+        statuses = []
+        for result in results:
+            exceeded = self.check_limits(test, result)
+            status = self.test_status(test, result, exceeded)
+            # Show the output of the first failure of each kind.
+            first_failure = status != "pass" and status not in statuses
+            if first_failure and result["output"]:
+                print(result["output"].decode("utf8", "replace"), end="")
+            statuses.append(status)
+
+        runtimes = [result["runtime"] for result in results
+                    if result["runtime"] is not None]
+        Reporter.report_stress(test_id, runs, statuses, runtimes)
+        return runs - statuses.count("pass")
 
     def skip_test(self, test):
         skip_list = set(test.get("skip", []))
@@ -307,7 +1383,7 @@ class TestRunner(object):
 def get_args():
     parser = argparse.ArgumentParser()
 
-    parser.add_argument("iotjs", action="store",
+    parser.add_argument("iotjs", action="store", nargs="?",
                         help="path to the iotjs binary file")
     parser.add_argument("--quiet", action="store_true", default=False,
                         help="show or hide the output of the tests")
@@ -315,18 +1391,130 @@ def get_args():
                         help="module list to skip test of specific modules")
     parser.add_argument("--timeout", action="store", default=300, type=int,
                         help="default timeout for the tests in seconds")
+    parser.add_argument("-j", "--jobs", action="store", default=1, type=int,
+                        help="number of tests to run in parallel "
+                             "(default: %(default)s)")
     parser.add_argument("--valgrind", action="store_true", default=False,
                         help="check tests with Valgrind")
+    parser.add_argument("--valgrind-cache", action="store", metavar="FILE",
+                        default=VALGRIND_CACHE_PATH,
+                        help="file of the tests which passed Valgrind, they "
+                             "are skipped until the binary or the test "
+                             "changes, pass an empty string to disable it "
+                             "(default: %(default)s)")
+    parser.add_argument("--valgrind-suppressions", action="store",
+                        metavar="FILE",
+                        help="Valgrind suppressions file")
+    parser.add_argument("--valgrind-gen-suppressions", action="store_true",
+                        default=False,
+                        help="append the suppressions of the reported "
+                             "Valgrind errors to --valgrind-suppressions")
+    parser.add_argument("--buildtype", choices=["debug", "release"],
+                        help="build type of the binary, used to separate "
+                             "the test history (default: guessed from the "
+                             "path of the binary)")
+    parser.add_argument("--history", action="store", metavar="FILE",
+                        default=TEST_HISTORY_PATH,
+                        help="file of the test runtimes of the previous "
+                             "runs, pass an empty string to disable it "
+                             "(default: %(default)s)")
     parser.add_argument("--coverage", action="store_true", default=False,
                         help="measure JavaScript coverage")
-
-    return parser.parse_args()
+    parser.add_argument("--output-json", action="store", metavar="FILE",
+                        help="write the results of the tests to FILE "
+                             "as JSON")
+    parser.add_argument("--output-junit", action="store", metavar="FILE",
+                        help="write the results of the tests to FILE "
+                             "in JUnit XML format")
+    parser.add_argument("--retries", action="store", default=0, type=int,
+                        help="run a failed test again at most this many "
+                             "times, it passes if any attempt passes "
+                             "(default: %(default)s)")
+    parser.add_argument("--stress", action="store", metavar="TEST",
+                        help="run only the given test (testset/name or the "
+                             "file name) many times in parallel and report "
+                             "how many runs failed")
+    parser.add_argument("--stress-runs", action="store", default=100,
+                        type=int,
+                        help="number of runs with --stress "
+                             "(default: %(default)s)")
+    parser.add_argument("--batch", action="store_true", default=False,
+                        help="run the tests marked as batch in testsets.json "
+                             "in groups, each group in one iotjs process")
+    parser.add_argument("--batch-size", action="store", default=20, type=int,
+                        help="maximum number of tests in a batch "
+                             "(default: %(default)s)")
+    parser.add_argument("--changed-since", action="store", metavar="REV",
+                        help="run only the tests affected by the files "
+                             "changed since the given git revision")
+    parser.add_argument("--shard-count", action="store", default=1, type=int,
+                        help="split the tests into this many shards, which "
+                             "are balanced by the test history "
+                             "(default: %(default)s)")
+    parser.add_argument("--shard-index", action="store", default=0, type=int,
+                        help="run only the tests of this shard, counted "
+                             "from zero (default: %(default)s)")
+    parser.add_argument("--merge-results", action="store", nargs="+",
+                        metavar="FILE",
+                        help="merge the JSON results of the shards into "
+                             "--output-json and --output-junit instead of "
+                             "running the tests")
+
+    options = parser.parse_args()
+
+    if options.merge_results:
+        if not options.output_json and not options.output_junit:
+            parser.error("--merge-results requires --output-json or "
+                         "--output-junit")
+    elif not options.iotjs:
+        parser.error("the path of the iotjs binary is required")
+
+    if options.valgrind_gen_suppressions and not options.valgrind_suppressions:
+        parser.error("--valgrind-gen-suppressions requires "
+                     "--valgrind-suppressions")
+    if options.retries < 0:
+        parser.error("--retries must not be negative")
+    if options.stress_runs < 1:
+        parser.error("--stress-runs must be at least 1")
+    if options.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if options.shard_count < 1:
+        parser.error("--shard-count must be at least 1")
+    if not 0 <= options.shard_index < options.shard_count:
+        parser.error("--shard-index must be less than --shard-count")
+
+    return options
+
+
+def merge_results(options):
+    configuration, summary, records = merge_json_results(
+        options.merge_results)
+
+    if options.output_json:
+        write_json_results(options.output_json, configuration, summary,
+                           records)
+    if options.output_junit:
+        write_junit_results(options.output_junit, records)
+
+    Reporter.report_final(summary)
+    return summary
 
 
 def main():
     options = get_args()
 
+    if options.merge_results:
+        summary = merge_results(options)
+        if summary.get("fail"):
+            sys.exit(1)
+        return
+
     testrunner = TestRunner(options)
+    if options.stress:
+        if testrunner.stress(options.stress, options.stress_runs):
+            sys.exit(1)
+        return
+
     testrunner.run()
     if testrunner.results["fail"]:
         sys.exit(1)
@@ -14,6 +14,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 import os
 
 from common_py.system.filesystem import FileSystem as fs
@@ -78,6 +79,50 @@ def build_iotjs(buildtype, args=[]):
                 '--clean',
                 '--buildtype=' + buildtype] + args)
 
+def write_shard_result(result_path, shard_index, shard_count, tests):
+    """ Write a shard result of testrunner which records the tests as
+        skipped.
+    """
+    result = {
+        'configuration': {'shard': [shard_index, shard_count],
+                          'shard_digest': 'check'},
+        'summary': {'pass': 0, 'fail': 0, 'timeout': 0, 'skip': len(tests)},
+        'tests': [{'testset': testset, 'name': name, 'status': 'skip'}
+                  for testset, name in tests]
+    }
+    with open(fs.join(TRAVIS_BUILD_PATH, result_path), 'w') as result_file:
+        json.dump(result, result_file)
+
+def check_merge_results(shard_count=2):
+    """ Check that testrunner merges the results of the shards covering
+        every test of testsets.json, and that it rejects them if a test is
+        missing.
+    """
+    with open(fs.join(TRAVIS_BUILD_PATH, 'test', 'testsets.json')) as f:
+        testsets = json.load(f)
+    tests = [(testset, test['name'])
+             for testset, testset_tests in sorted(testsets.items())
+             for test in testset_tests]
+
+    shard_results = [fs.join('build', 'shard_%d.json' % shard_index)
+                     for shard_index in range(shard_count)]
+    merge_cmd = ['./tools/testrunner.py', '--merge-results'] + \
+                shard_results + ['--output-json=build/shards.json']
+
+    for shard_index, shard_result in enumerate(shard_results):
+        write_shard_result(shard_result, shard_index, shard_count,
+                           tests[shard_index::shard_count])
+    exec_docker(DOCKER_IOTJS_PATH, merge_cmd)
+
+    write_shard_result(shard_results[0], 0, shard_count,
+                       tests[shard_count::shard_count])
+    code = ex.run_cmd('docker', [
+                      'exec', DOCKER_NAME, 'bash', '-c',
+                      'cd %s && %s' % (DOCKER_IOTJS_PATH,
+                                       ' '.join(merge_cmd))])
+    if code == 0:
+        ex.fail('The results of the shards were merged with a missing test')
+
 if __name__ == '__main__':
     if os.getenv('RUN_DOCKER') == 'yes':
         run_docker()
@@ -95,6 +140,8 @@ if __name__ == '__main__':
                         '--run-test=full',
                         '--profile=test/profiles/host-linux.profile'])
 
+        check_merge_results()
+
     elif test == 'rpi2':
         for buildtype in BUILDTYPES:
             build_iotjs(buildtype, [
@@ -174,6 +221,15 @@ if __name__ == '__main__':
             build_iotjs(buildtype, ['--run-test=full', '--no-snapshot',
                                     '--jerry-lto'])
 
+    elif test == "split-snapshot":
+        for buildtype in BUILDTYPES:
+            build_iotjs(buildtype, ['--run-test=full', '--split-snapshot'])
+
+    elif test == "js-compression":
+        for buildtype in BUILDTYPES:
+            build_iotjs(buildtype, ['--run-test=full', '--no-snapshot',
+                                    '--js-compression'])
+
     elif test == "host-darwin":
         for buildtype in BUILDTYPES:
             ex.check_run_cmd('./tools/build.py', [